@@ -1,20 +1,88 @@
-from flask import Flask, render_template, request, jsonify
-import wfdb
+from flask import Flask, Response, g, render_template, request, jsonify
+from functools import lru_cache
 import numpy as np
 import os
-import pandas as pd
+import struct
+import time
+import plotly
 import plotly.graph_objects as go
-import requests
-from pyascon.ascon import ascon_encrypt
-from smaj_kyber import encapsulate, set_mode
+import plotly.offline
+import batch_upload
+import decimate
+import ecg_grid
+import metrics
+import record_store
+import render_cache
+import upload_jobs
+import upload_pipeline
+from upload_pipeline import BASE_ECG_DIR, record_path
 
 app = Flask(__name__)
+log = metrics.get_logger("app")
 
-# === Path & Crypto Setup ===
-BASE_ECG_DIR = "/Users/mac/Desktop/secure by design/norway/norwegian-endurance-athlete-ecg-database-1.0.0/"
-SERVER_URL = os.getenv("SERVER_URL")
+# Decoded records are cached in memory (see record_store.py); RECORD_PREFETCH=1 loads the whole dataset at startup
+RECORDS = record_store.get_store()
+if os.getenv("RECORD_PREFETCH", "0") == "1":
+    RECORDS.prefetch(BASE_ECG_DIR)
 
-set_mode("512")
+# Each lead is reduced to about VIEWER_POINTS points ("minmax" keeps every peak, "lttb", or "none")
+VIEWER_POINTS = int(os.getenv("ECG_VIEWER_POINTS", "2000"))
+DECIMATION = os.getenv("ECG_DECIMATION", "minmax")
+MAX_WINDOW_POINTS = 20000
+# "svg" (go.Scatter, data embedded in the page) or "webgl" (go.Scattergl, data fetched from /athlete/<id>/data.bin)
+VIEWER_MODE = os.getenv("ECG_VIEWER_MODE", "svg")
+VIEWER_MODES = ("svg", "webgl")
+# data.bin layout (little endian): magic | version (uint16) | leads (uint16) | points (uint32) | fs (float32),
+# then the times (float32 x points) and every lead's values in mV (float32 x points, NaN = missing)
+SERIES_MAGIC = b"ECGF"
+SERIES_HEADER = "<4sHHIf"
+
+# Rendered viewer pages are cached (on disk too with VIEWER_CACHE_DIR) and revalidated with ETags
+VIEWER_PAGES = render_cache.RenderCache(cache_dir=os.getenv("VIEWER_CACHE_DIR"))
+VIEWER_TEMPLATE = os.path.join(app.root_path, app.template_folder, "ecg_viewer.html")
+# Plotly JS is served by this app (no CDN on the clinical network) under a versioned, long-cached URL
+PLOTLY_JS_URL = f"/assets/plotly-{plotly.__version__}.min.js"
+
+# Uploads run in the background (UPLOAD_WORKERS threads, at most UPLOAD_QUEUE_SIZE pending);
+# set UPLOAD_JOB_DB to an SQLite file to keep jobs across restarts
+UPLOAD_JOB_DB = os.getenv("UPLOAD_JOB_DB")
+UPLOAD_HANDLERS = {
+    "athlete": lambda job, athlete_id: upload_pipeline.upload(athlete_id, job),
+    "batch": lambda job, athlete_ids, workers: batch_upload.run_batch(athlete_ids, **workers),
+}
+
+
+def run_upload_job(job, kind, *args):
+    # Worker threads log under the id of the request that submitted the job
+    with metrics.request_id(job.request_id or job.id):
+        return UPLOAD_HANDLERS[kind](job, *args)
+
+
+UPLOAD_JOBS = upload_jobs.JobQueue(run_upload_job,
+                                   store=upload_jobs.JobStore(UPLOAD_JOB_DB) if UPLOAD_JOB_DB else None)
+
+
+@app.before_request
+def start_request():
+    g.request_id_token = metrics.set_request_id(request.headers.get("X-Request-ID"))
+    g.request_start = time.perf_counter()
+    metrics.IN_FLIGHT.inc(stage="http")
+
+
+@app.after_request
+def finish_request(response):
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.HTTP_SECONDS.observe(time.perf_counter() - g.request_start, method=request.method, endpoint=endpoint)
+    metrics.HTTP_REQUESTS.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+    response.headers["X-Request-ID"] = metrics.current_request_id()
+    return response
+
+
+@app.teardown_request
+def end_request(exc):
+    if "request_id_token" in g:
+        metrics.IN_FLIGHT.dec(stage="http")
+        metrics.reset_request_id(g.pop("request_id_token"))
 
 
 @app.route('/')
@@ -24,12 +92,26 @@ def redirect_to_first():
 
 @app.route('/athlete/<int:athlete_id>')
 def ecg_viewer(athlete_id):
+    path = record_path(athlete_id)
+    mode = request.args.get("mode", VIEWER_MODE)
+    if mode not in VIEWER_MODES:
+        return f"Unknown viewer mode {mode!r}", 400
+    # Everything the page depends on; its hash is the ETag, so revalidation needs no rendering
+    key = {"athlete_id": athlete_id, "mode": mode, "record": RECORDS.cache_key(path), "points": VIEWER_POINTS,
+           "decimation": DECIMATION, "template": os.stat(VIEWER_TEMPLATE).st_mtime_ns, "plotly": plotly.__version__}
+    etag = render_cache.etag_for(key)
+    if request.if_none_match.contains(etag.strip('"')):
+        return "", 304, {"ETag": etag}
     try:
-        record_path = os.path.join(BASE_ECG_DIR, f"ath_{athlete_id:03d}")
-        signals, _ = wfdb.rdsamp(record_path)
+        page, etag = VIEWER_PAGES.get_or_render(
+            key, lambda: render_viewer(athlete_id, RECORDS.get(path).physical(), mode))
     except Exception as e:
         return f"Error loading athlete {athlete_id}: {e}"
+    return page, 200, {"ETag": etag, "Cache-Control": "no-cache"}
+
 
+@metrics.timer("viewer_render")
+def render_viewer(athlete_id, signals, mode="svg"):
     sampling_rate = 500
 
     duration_sec = signals.shape[0] / sampling_rate
@@ -43,99 +125,202 @@ def ecg_viewer(athlete_id):
     vertical_offsets = vertical_offsets[::-1]
 
     fig = go.Figure()
-    for i in range(12):
-        y = (signals[:, i] + vertical_offsets[i]).tolist()
-        fig.add_trace(go.Scatter(
-            x=time_axis.tolist(),
-            y=y,
-            mode='lines',
-            name=lead_names[i],
-            line=dict(color='black', width=1),
-            showlegend=False
-        ))
-
-    # ECG-style grid
-    shapes = []
-    grid_color = 'rgba(255, 0, 0, 0.5)'
-    for t in np.arange(0, duration_sec + 0.2, 0.2):
-        shapes.append(dict(type='line', x0=t, x1=t, y0=vertical_offsets[-1] - 2, y1=vertical_offsets[0] + 2,
-                           line=dict(color=grid_color, width=0.8)))
-    for y in np.arange(vertical_offsets[-1] - 2, vertical_offsets[0] + 2, 0.5):
-        shapes.append(dict(type='line', x0=0, x1=duration_sec, y0=y, y1=y, line=dict(color=grid_color, width=0.8)))
+    if mode == "webgl":
+        # WebGL traces start empty; the page loads their data from /athlete/<id>/data.bin
+        for i in range(12):
+            fig.add_trace(go.Scattergl(x=[], y=[], mode='lines', name=lead_names[i],
+                                       line=dict(color='black', width=1), showlegend=False))
+    else:
+        # Decimated to about the plot width; zooming in fetches more detail from /athlete/<id>/window
+        idx = decimate.decimate(signals, VIEWER_POINTS, DECIMATION)
+        for i in range(12):
+            lead_idx = idx[:, i]
+            fig.add_trace(go.Scatter(
+                x=time_axis[lead_idx],
+                y=signals[lead_idx, i] + vertical_offsets[i],
+                mode='lines',
+                name=lead_names[i],
+                line=dict(color='black', width=1),
+                showlegend=False
+            ))
 
     fig.update_layout(
         title="12-Lead ECG Viewer (Clinical Layout)",
-        xaxis=dict(title="Time (seconds)", showgrid=False),
+        xaxis=dict(title="Time (seconds)"),
         yaxis=dict(
             tickmode='array',
             tickvals=vertical_offsets,
-            ticktext=lead_names,
-            showgrid=False
+            ticktext=lead_names
         ),
-        shapes=shapes,
         template="simple_white",
         height=800,
         margin=dict(l=60, r=30, t=60, b=40)
     )
+    # ECG-style grid (axis gridlines, see ecg_grid.py)
+    ecg_grid.apply_ecg_grid(fig, (0, duration_sec), (vertical_offsets[-1] - 2, vertical_offsets[0] + 2))
 
-    plot_div = fig.to_html(full_html=False)
-    return render_template("ecg_viewer.html", graph_html=plot_div, athlete_id=athlete_id)
+    plot_div = fig.to_html(full_html=False, include_plotlyjs=False, div_id="ecg-plot")
+    return render_template("ecg_viewer.html", graph_html=plot_div, athlete_id=athlete_id,
+                           lead_offsets=vertical_offsets.tolist(), duration=duration_sec,
+                           plotly_js_url=PLOTLY_JS_URL, viewer_mode=mode)
 
 
-@app.route('/upload-ecg/<int:athlete_id>', methods=['POST'])
-def upload_ecg(athlete_id):
-    print("AAAA", athlete_id)
+@app.route('/athlete/<int:athlete_id>/data.bin')
+def ecg_series(athlete_id):
+    """
+    Every lead between start and end (seconds) as float32 arrays on one shared time axis, min/max decimated
+    to about width points (see SERIES_HEADER for the layout). Used by the WebGL viewer.
+    """
     try:
-        # === Step 1: Get Server Public Key ===
-        resp = requests.get(f"{SERVER_URL}/kyber-public-key", timeout=5)
-        resp.raise_for_status()
-        server_pk = resp.content
-        print("[INFO] Received Kyber public key from server.")
+        record = RECORDS.get(record_path(athlete_id))
     except Exception as e:
-        return jsonify({"status": "error", "message": "Kyber key fetch failed", "error": str(e)}), 500
+        return jsonify({"status": "error", "message": f"Error loading athlete {athlete_id}", "error": str(e)}), 404
+    try:
+        start = float(request.args.get("start", 0))
+        end = float(request.args.get("end", record.duration))
+        width = min(MAX_WINDOW_POINTS, max(10, int(request.args.get("width", VIEWER_POINTS))))
+        first, signals = record.window(start, end)
+        positions, values = decimate.minmax_shared(signals, width)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": "Invalid data request", "error": str(e)}), 400
+
+    header = struct.pack(SERIES_HEADER, SERIES_MAGIC, 1, values.shape[1], len(positions), record.fs)
+    body = b"".join([header, ((first + positions) / record.fs).astype("<f4").tobytes(),
+                     np.ascontiguousarray(values.T, dtype="<f4").tobytes()])
+    return Response(body, mimetype="application/octet-stream")
+
+
+@lru_cache(maxsize=1)
+def plotly_js():
+    return plotly.offline.get_plotlyjs()
 
-    # === Step 2: Load ECG ===
+
+@app.route('/assets/plotly-<version>.min.js')
+def plotly_js_asset(version):
+    if version != plotly.__version__:
+        return "Unknown Plotly version", 404
+    response = Response(plotly_js(), mimetype="application/javascript")
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def json_values(values, decimals=4):
+    """Rounded floats for JSON, with missing samples (NaN) as null."""
+    return [None if v != v else v for v in np.round(values, decimals).tolist()]
+
+
+@app.route('/athlete/<int:athlete_id>/window')
+def ecg_window(athlete_id):
+    """Decimated samples of every lead between start and end (seconds), about width points per lead."""
     try:
-        record_path = os.path.join(BASE_ECG_DIR, f"ath_{athlete_id:03d}")
-        signals, fields = wfdb.rdsamp(record_path)
+        record = RECORDS.get(record_path(athlete_id))
     except Exception as e:
-        return jsonify(
-            {"status": "error", "message": f"ECG record not found for athlete {athlete_id}", "error": str(e)}), 404
-
-    # === Step 3: Prepare JSON Payload ===
-    df = pd.DataFrame(signals, columns=fields['sig_name'])
-
-    lead_case_fix = {
-        'AVR': 'aVR', 'AVL': 'aVL', 'AVF': 'aVF',
-        'I': 'I', 'II': 'II', 'III': 'III',
-        'V1': 'V1', 'V2': 'V2', 'V3': 'V3',
-        'V4': 'V4', 'V5': 'V5', 'V6': 'V6'
-    }
-    df.rename(columns=lambda col: lead_case_fix.get(col, col), inplace=True)
-    df.insert(0, "time", np.arange(signals.shape[0]) / fields['fs'])
-
-    json_data = df.to_json(orient='records')
-
-    # === Step 4: Kyber + Ascon ===
-    ct, shared_secret = encapsulate(server_pk)
-    key = shared_secret[:16]
-    nonce = b"12345678abcdef12"
-    ciphertext = ascon_encrypt(key=key, nonce=nonce, plaintext=json_data.encode(), associateddata=b"")
-
-    payload = {
-        "nonce": nonce.hex(),
-        "ciphertext": ciphertext.hex(),
-        "kyber_ciphertext": ct.hex(),
-        "id": athlete_id
-    }
-
-    print("hi")
+        return jsonify({"status": "error", "message": f"Error loading athlete {athlete_id}", "error": str(e)}), 404
+    try:
+        start = float(request.args.get("start", 0))
+        end = float(request.args.get("end", record.duration))
+        width = min(MAX_WINDOW_POINTS, max(10, int(request.args.get("width", VIEWER_POINTS))))
+        method = request.args.get("method", DECIMATION)
+        first, signals = record.window(start, end)
+        idx = decimate.decimate(signals, width, method)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": "Invalid window request", "error": str(e)}), 400
 
+    leads = [{"name": name, "t": json_values((first + idx[:, i]) / record.fs), "v": json_values(signals[idx[:, i], i])}
+             for i, name in enumerate(record.lead_names)]
+    return jsonify({"athlete_id": athlete_id, "start": start, "end": end, "fs": record.fs, "method": method,
+                    "points": len(idx), "leads": leads})
+
+
+@app.route('/upload-ecg/<int:athlete_id>', methods=['POST'])
+def upload_ecg(athlete_id):
+    try:
+        job, created = UPLOAD_JOBS.submit(athlete_id, "athlete", athlete_id,
+                                          request_id=metrics.current_request_id())
+    except upload_jobs.QueueFull as e:
+        log.warning("upload rejected, queue full", extra={"athlete_id": athlete_id})
+        return queue_full(e)
+    log.info("upload queued", extra={"athlete_id": athlete_id, "job_id": job.id, "new_job": created})
+    return job_accepted(job, created)
+
+
+@app.route('/upload-ecg/batch', methods=['POST'])
+def upload_ecg_batch():
+    """
+    Upload many athletes in one job. JSON body (all optional):
+    {"ids": [1, 2, "5-9"]} or {"start": 1, "end": 28}, plus "load_workers", "encrypt_workers", "send_workers".
+    The finished job's result holds the per-record results and records/sec and MB/sec.
+    """
+    options = request.get_json(silent=True) or {}
     try:
-        r = requests.post(f"{SERVER_URL}/secure-ecg", json=payload, headers={"Content-Type": "application/json"})
-        return jsonify({"status": "success", "response": r.text})
-    except requests.exceptions.RequestException as e:
-        return jsonify({"status": "error", "message": "Upload failed", "error": str(e)}), 500
+        if "ids" in options:
+            ids = options["ids"]
+            athlete_ids = batch_upload.parse_ids(ids if isinstance(ids, list) else [ids])
+        elif "start" in options:
+            athlete_ids = list(range(int(options["start"]), int(options.get("end", options["start"])) + 1))
+        else:
+            athlete_ids = batch_upload.available_athletes()
+        workers = {name: int(options[name]) for name in ("load_workers", "encrypt_workers", "send_workers")
+                   if name in options}
+    except (TypeError, ValueError) as e:
+        return jsonify({"status": "error", "message": "Invalid batch request", "error": str(e)}), 400
+    if not athlete_ids or any(count < 1 for count in workers.values()):
+        return jsonify({"status": "error", "message": "Invalid batch request"}), 400
+
+    try:
+        job, created = UPLOAD_JOBS.submit("batch", "batch", athlete_ids, workers,
+                                          request_id=metrics.current_request_id())
+    except upload_jobs.QueueFull as e:
+        log.warning("batch upload rejected, queue full", extra={"records": len(athlete_ids)})
+        return queue_full(e)
+    log.info("batch upload queued", extra={"records": len(athlete_ids), "job_id": job.id, "new_job": created})
+    return job_accepted(job, created)
+
+
+def job_accepted(job, created):
+    return jsonify({"status": job.status, "job_id": job.id, "created": created,
+                    "status_url": f"/upload-jobs/{job.id}"}), 202
+
+
+def queue_full(e):
+    return jsonify({"status": "error", "message": "Upload queue is full, retry later", "error": str(e)}), \
+        503, {"Retry-After": "5"}
+
+
+@app.route('/upload-jobs/<job_id>')
+def upload_job_status(job_id):
+    job = UPLOAD_JOBS.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"Unknown upload job {job_id}"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/upload-jobs')
+def upload_jobs_stats():
+    return jsonify(UPLOAD_JOBS.stats())
+
+
+@app.route('/record-store-stats')
+def record_store_stats():
+    return jsonify(RECORDS.stats())
+
+
+@app.route('/viewer-cache-stats')
+def viewer_cache_stats():
+    return jsonify(VIEWER_PAGES.stats())
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text format: stage histograms, upload byte counters, in-flight gauges, HTTP requests."""
+    metrics.UPLOAD_QUEUE_PENDING.set(UPLOAD_JOBS.stats()["pending"])
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route('/transport-stats')
+def transport_stats():
+    return jsonify(upload_pipeline.HTTP.stats())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,153 @@
+"""
+Upload many athletes at once as a staged pipeline:
+
+    load + serialize (thread pool)  ->  encrypt (process pool)  ->  send (thread pool)
+
+Records flow through the stages independently (a record is sent as soon as it is encrypted), with at
+most `in_flight` records between loading and a finished send, so memory stays bounded. Kyber session
+keys and nonces are handed out in this process; workers only get the raw per-message key.
+
+usage: python batch_upload.py [ids ...] [--load-workers N] [--encrypt-workers N] [--send-workers N]
+       ids: athlete numbers or ranges, e.g. 1-28 or 3 5 7-9 (default: every record in BASE_ECG_DIR)
+"""
+
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import metrics
+import upload_pipeline
+from pyascon.ascon import ascon_encrypt
+
+LOAD_WORKERS = int(os.getenv("BATCH_LOAD_WORKERS", "4"))
+ENCRYPT_WORKERS = int(os.getenv("BATCH_ENCRYPT_WORKERS", str(os.cpu_count() or 1)))
+SEND_WORKERS = int(os.getenv("BATCH_SEND_WORKERS", "4"))
+
+
+def available_athletes():
+    names = glob.glob(os.path.join(upload_pipeline.BASE_ECG_DIR, "ath_*.hea"))
+    return sorted(int(os.path.basename(name)[4:7]) for name in names)
+
+
+def parse_ids(specs):
+    """["1-3", "7"] -> [1, 2, 3, 7]"""
+    ids = []
+    for spec in specs:
+        for part in str(spec).split(","):
+            if "-" in part:
+                first, last = part.split("-")
+                ids.extend(range(int(first), int(last) + 1))
+            elif part:
+                ids.append(int(part))
+    return ids
+
+
+def _load(athlete_id):
+    start = time.perf_counter()
+    ecg_payload = upload_pipeline.load_record(athlete_id)
+    compression_header, plaintext, compression_stats = upload_pipeline.serialize(ecg_payload)
+    return len(ecg_payload), compression_header, plaintext, time.perf_counter() - start
+
+
+def _encrypt(key, nonce, associateddata, plaintext):
+    start = time.perf_counter()
+    ciphertext = ascon_encrypt(key, nonce, associateddata, plaintext)
+    return ciphertext, time.perf_counter() - start
+
+
+def run_batch(athlete_ids, load_workers=LOAD_WORKERS, encrypt_workers=ENCRYPT_WORKERS,
+              send_workers=SEND_WORKERS, in_flight=None):
+    """Upload every athlete in athlete_ids; returns a report with per-record results and throughput."""
+    athlete_ids = list(dict.fromkeys(athlete_ids))
+    in_flight = in_flight or 2 * (load_workers + encrypt_workers + send_workers)
+    slots = threading.Semaphore(in_flight)
+    finished = threading.Event()
+    lock = threading.Lock()
+    records = {}
+    remaining = [len(athlete_ids)]
+
+    def finish(athlete_id, **result):
+        with lock:
+            records[athlete_id].update(result)
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                finished.set()
+        slots.release()
+
+    def loaded(athlete_id, future):
+        try:
+            raw_bytes, compression_header, plaintext, seconds = future.result()
+            records[athlete_id].update(raw_bytes=raw_bytes, load_s=seconds)
+            session, seq, key, nonce = message = upload_pipeline.next_message()
+            associateddata = upload_pipeline.associated_data(athlete_id, compression_header, message)
+            encrypted = encryptors.submit(_encrypt, bytes(key), nonce, associateddata, plaintext)
+        except Exception as e:
+            return finish(athlete_id, status="error", error=str(e))
+        encrypted.add_done_callback(lambda f: encrypted_done(athlete_id, message, compression_header, f))
+
+    def encrypted_done(athlete_id, message, compression_header, future):
+        try:
+            ciphertext, seconds = future.result()
+            records[athlete_id].update(wire_bytes=len(ciphertext), encrypt_s=seconds)
+            metrics.STAGE_SECONDS.observe(seconds, stage="encrypt")
+            request_args = upload_pipeline.build_request(athlete_id, compression_header, None, message, ciphertext)
+            senders.submit(sent, athlete_id, request_args)
+        except Exception as e:
+            return finish(athlete_id, status="error", error=str(e))
+
+    def sent(athlete_id, request_args):
+        start = time.perf_counter()
+        try:
+            r = upload_pipeline.send(request_args)
+        except Exception as e:
+            return finish(athlete_id, status="error", error=str(e), send_s=time.perf_counter() - start)
+        finish(athlete_id, status="success" if r.ok else "error", http_status=r.status_code,
+               send_s=time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(load_workers) as loaders, \
+            ProcessPoolExecutor(encrypt_workers) as encryptors, \
+            ThreadPoolExecutor(send_workers) as senders:
+        for athlete_id in athlete_ids:
+            slots.acquire()
+            records[athlete_id] = {"id": athlete_id}
+            future = loaders.submit(_load, athlete_id)
+            future.add_done_callback(lambda f, athlete_id=athlete_id: loaded(athlete_id, f))
+        if athlete_ids:
+            finished.wait()
+    elapsed = time.perf_counter() - start
+
+    results = [records[athlete_id] for athlete_id in athlete_ids]
+    succeeded = [r for r in results if r.get("status") == "success"]
+    raw_mb = sum(r.get("raw_bytes", 0) for r in succeeded) / 1e6
+    wire_mb = sum(r.get("wire_bytes", 0) for r in succeeded) / 1e6
+    return {
+        "records": len(results),
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "seconds": round(elapsed, 3),
+        "records_per_sec": round(len(succeeded) / elapsed, 3) if elapsed else None,
+        "mb_per_sec": round(raw_mb / elapsed, 3) if elapsed else None,
+        "wire_mb_per_sec": round(wire_mb / elapsed, 3) if elapsed else None,
+        "workers": {"load": load_workers, "encrypt": encrypt_workers, "send": send_workers, "in_flight": in_flight},
+        "stage_seconds": {stage: round(sum(r.get(f"{stage}_s", 0) for r in results), 3)
+                          for stage in ("load", "encrypt", "send")},
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Encrypt and upload ECG records of many athletes")
+    parser.add_argument("ids", nargs="*", help="athlete numbers or ranges (default: all records)")
+    parser.add_argument("--load-workers", type=int, default=LOAD_WORKERS)
+    parser.add_argument("--encrypt-workers", type=int, default=ENCRYPT_WORKERS)
+    parser.add_argument("--send-workers", type=int, default=SEND_WORKERS)
+    args = parser.parse_args()
+
+    report = run_batch(parse_ids(args.ids) or available_athletes(), args.load_workers, args.encrypt_workers,
+                       args.send_workers)
+    print(json.dumps(report, indent=2))
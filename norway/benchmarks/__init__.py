@@ -0,0 +1,7 @@
+"""
+Benchmark suite for the crypto primitives, the upload pipeline and the viewer.
+
+Run from the norway directory:
+    python -m benchmarks.run [--suite crypto,pipeline,viewer] [--quick] [--output results.json]
+                             [--baseline baseline.json] [--threshold 0.15]
+"""
@@ -0,0 +1,39 @@
+"""Ascon primitives across message sizes, and Kyber512 key generation / encapsulation / decapsulation."""
+
+import os
+
+from smaj_kyber import decapsulate, encapsulate, keygen, set_mode
+
+from benchmarks.harness import Benchmark
+from pyascon.ascon import AsconKey, ascon_decrypt, ascon_encrypt, ascon_hash, ascon_mac
+
+SIZES = [16, 1024, 64 * 1024, 1024 * 1024, 10 * 1024 * 1024]
+QUICK_SIZES = [16, 1024, 64 * 1024]
+
+
+def _bench(name, function, size):
+    # Pure-Python Ascon runs at well under 1 MB/s: fewer repetitions and no warm-up for the large messages
+    repeat = 20 if size <= 1024 else 5 if size <= 64 * 1024 else 1
+    return Benchmark(name, function, size, repeat, warmup=size <= 64 * 1024)
+
+
+def benchmarks(quick=False):
+    key = bytes(range(16))
+    nonce = bytes(range(16, 32))
+    prepared_key = AsconKey(key)
+
+    for size in QUICK_SIZES if quick else SIZES:
+        message = os.urandom(size)
+        ciphertext = ascon_encrypt(key, nonce, b"", message)
+        yield _bench(f"ascon_encrypt[{size}]", lambda m=message: ascon_encrypt(key, nonce, b"", m), size)
+        yield _bench(f"ascon_encrypt_askey[{size}]", lambda m=message: ascon_encrypt(prepared_key, nonce, b"", m), size)
+        yield _bench(f"ascon_decrypt[{size}]", lambda c=ciphertext: ascon_decrypt(key, nonce, b"", c), size)
+        yield _bench(f"ascon_hash[{size}]", lambda m=message: ascon_hash(m), size)
+        yield _bench(f"ascon_mac[{size}]", lambda m=message: ascon_mac(key, m), size)
+
+    set_mode("512")
+    public_key, secret_key = keygen()
+    kyber_ciphertext, _ = encapsulate(public_key)
+    yield Benchmark("kyber512_keygen", keygen, repeat=20)
+    yield Benchmark("kyber512_encapsulate", lambda: encapsulate(public_key), repeat=20)
+    yield Benchmark("kyber512_decapsulate", lambda: decapsulate(kyber_ciphertext, secret_key), repeat=20)
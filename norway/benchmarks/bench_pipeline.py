@@ -0,0 +1,60 @@
+"""
+Per-stage timings of the upload pipeline (upload_pipeline.py) against the local stub server.
+SERVER_URL must point at the stub server before this module is imported (the runner does that).
+"""
+
+import wfdb
+
+import ecg_codec
+import ecg_compression
+import record_store
+import upload_pipeline
+from benchmarks.harness import Benchmark
+from pyascon.ascon import ascon_encrypt
+
+ATHLETE_ID = 1
+
+
+def _with_transport(transport, function):
+    def run():
+        previous = upload_pipeline.UPLOAD_TRANSPORT
+        upload_pipeline.UPLOAD_TRANSPORT = transport
+        try:
+            return function()
+        finally:
+            upload_pipeline.UPLOAD_TRANSPORT = previous
+    return run
+
+
+def _cold_load():
+    record_store.get_store().clear()
+    return upload_pipeline.load_record(ATHLETE_ID)
+
+
+def benchmarks(quick=False):
+    path = upload_pipeline.record_path(ATHLETE_ID)
+    payload = upload_pipeline.load_record(ATHLETE_ID)
+    header, compressed, _ = ecg_compression.compress(payload)
+    message = upload_pipeline.next_message()
+    _, _, key, nonce = message
+    associateddata = upload_pipeline.associated_data(ATHLETE_ID, header, message)
+    ciphertext = ascon_encrypt(key, nonce, associateddata, compressed)
+    repeat = 3 if quick else 10
+
+    yield Benchmark("pipeline.load.wfdb_rdsamp", lambda: wfdb.rdsamp(path), repeat=repeat)
+    yield Benchmark("pipeline.load.record_store_cold", _cold_load, len(payload), repeat)
+    yield Benchmark("pipeline.load.record_store_cached", lambda: upload_pipeline.load_record(ATHLETE_ID),
+                    len(payload), repeat)
+    yield Benchmark("pipeline.serialize.dataframe_to_json",
+                    lambda: ecg_codec.to_dataframe(payload).to_json(orient='records'), len(payload), repeat)
+    for codec in ecg_compression.CODECS:
+        yield Benchmark(f"pipeline.serialize.compress[{codec}]",
+                        lambda codec=codec: ecg_compression.compress(payload, codec, 1), len(payload), repeat)
+    yield Benchmark("pipeline.session.next_message", upload_pipeline.next_message, repeat=repeat)
+    yield Benchmark("pipeline.encrypt.ascon_encrypt", lambda: ascon_encrypt(key, nonce, associateddata, compressed),
+                    len(compressed), repeat)
+    for transport in ("binary", "json"):
+        yield Benchmark(f"pipeline.send[{transport}]", _with_transport(transport, lambda: upload_pipeline.send(
+            upload_pipeline.build_request(ATHLETE_ID, header, None, message, ciphertext))), len(ciphertext), repeat)
+        yield Benchmark(f"pipeline.upload[{transport}]",
+                        _with_transport(transport, lambda: upload_pipeline.upload(ATHLETE_ID)), len(payload), repeat)
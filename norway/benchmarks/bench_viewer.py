@@ -0,0 +1,30 @@
+"""Viewer render time per athlete (SVG and WebGL modes), and a cached page request for comparison."""
+
+import app
+import batch_upload
+from benchmarks.harness import Benchmark
+
+
+def _render(athlete_id, mode):
+    record = app.RECORDS.get(app.record_path(athlete_id))
+
+    def run():
+        with app.app.test_request_context(f"/athlete/{athlete_id}"):
+            return app.render_viewer(athlete_id, record.physical(), mode)
+    return run
+
+
+def benchmarks(quick=False):
+    athletes = batch_upload.available_athletes()
+    athletes = athletes[:3] if quick else athletes
+    for athlete_id in athletes:
+        for mode in app.VIEWER_MODES:
+            yield Benchmark(f"viewer.render[{mode}][ath_{athlete_id:03d}]", _render(athlete_id, mode), repeat=3)
+
+    if athletes:
+        client = app.app.test_client()
+        url = f"/athlete/{athletes[0]}"
+        yield Benchmark("viewer.request_cached", lambda: client.get(url), repeat=20)
+        etag = client.get(url).headers["ETag"]
+        yield Benchmark("viewer.request_not_modified", lambda: client.get(url, headers={"If-None-Match": etag}),
+                        repeat=20)
@@ -0,0 +1,112 @@
+"""
+Timing, machine information and baseline comparison for the benchmark runner.
+
+A benchmark is a Benchmark(name, function, nbytes, repeat): function() is called repeat times
+(after one untimed warm-up call) and the per-call wall times are summarised.
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+
+class Benchmark:
+
+    def __init__(self, name, function, nbytes=None, repeat=5, warmup=True):
+        self.name = name
+        self.function = function
+        self.nbytes = nbytes
+        self.repeat = repeat
+        self.warmup = warmup
+
+
+def measure(benchmark):
+    if benchmark.warmup:
+        benchmark.function()
+    times = []
+    for _ in range(benchmark.repeat):
+        start = time.perf_counter()
+        benchmark.function()
+        times.append(time.perf_counter() - start)
+    median = statistics.median(times)
+    result = {
+        "repeat": benchmark.repeat,
+        "min_s": min(times),
+        "median_s": median,
+        "mean_s": statistics.fmean(times),
+        "stdev_s": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "ops_per_s": 1 / median if median else None,
+    }
+    if benchmark.nbytes:
+        result["bytes"] = benchmark.nbytes
+        result["mb_per_s"] = benchmark.nbytes / median / 1e6 if median else None
+    return result
+
+
+def run(benchmarks, log=print):
+    results = {}
+    for benchmark in benchmarks:
+        results[benchmark.name] = measure(benchmark)
+        r = results[benchmark.name]
+        throughput = f"  {r['mb_per_s']:9.3f} MB/s" if "mb_per_s" in r else ""
+        log(f"{benchmark.name:55s} median {r['median_s'] * 1000:11.3f} ms{throughput}")
+    return results
+
+
+# === Machine information ===
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def machine_info():
+    import numpy as np
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "git_revision": _git_revision(),
+    }
+
+
+# === Results files ===
+
+def save(path, suites, results):
+    with open(path, "w") as f:
+        json.dump({"machine": machine_info(), "suites": suites, "results": results}, f, indent=2)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results, baseline, threshold=0.15):
+    """
+    Compare median times with a baseline results file.
+    Returns a list of (name, baseline_s, current_s, change) and the names that got slower than threshold.
+    """
+    rows, regressions = [], []
+    for name, result in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        change = result["median_s"] / previous["median_s"] - 1 if previous["median_s"] else 0.0
+        rows.append((name, previous["median_s"], result["median_s"], change))
+        if change > threshold:
+            regressions.append(name)
+    return rows, regressions
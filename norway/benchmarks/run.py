@@ -0,0 +1,70 @@
+"""
+Benchmark runner: runs the selected suites, writes JSON results with machine information and
+optionally compares them with a baseline results file (exit status 1 on regressions).
+
+usage (from the norway directory):
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline results.json --threshold 0.15
+"""
+
+import argparse
+import importlib
+import os
+import sys
+
+from benchmarks import harness
+from benchmarks.stub_server import StubServer
+
+SUITES = ("crypto", "pipeline", "viewer")
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "norwegian-endurance-athlete-ecg-database-1.0.0")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the crypto, pipeline and viewer benchmarks")
+    parser.add_argument("--suite", default=",".join(SUITES), help=f"comma-separated subset of {', '.join(SUITES)}")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and fewer repetitions")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="WFDB dataset directory")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare with this results file")
+    parser.add_argument("--threshold", type=float, default=0.15, help="slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    suites = [name.strip() for name in args.suite.split(",") if name.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(sorted(unknown))}")
+
+    # The pipeline and viewer modules read their configuration at import time
+    stub = StubServer().start()
+    os.environ["SERVER_URL"] = stub.url
+    import upload_pipeline
+    upload_pipeline.BASE_ECG_DIR = args.data_dir
+
+    results = {}
+    try:
+        for suite in suites:
+            print(f"== {suite} ==")
+            module = importlib.import_module(f"benchmarks.bench_{suite}")
+            results.update(harness.run(module.benchmarks(args.quick)))
+    finally:
+        stub.stop()
+
+    if args.output:
+        harness.save(args.output, suites, results)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        rows, regressions = harness.compare(results, harness.load(args.baseline), args.threshold)
+        print(f"== compared with {args.baseline} ==")
+        for name, before, after, change in rows:
+            flag = "  REGRESSION" if name in regressions else ""
+            print(f"{name:55s} {before * 1000:11.3f} -> {after * 1000:11.3f} ms  {change:+7.1%}{flag}")
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
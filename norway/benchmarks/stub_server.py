@@ -0,0 +1,72 @@
+"""
+Local stand-in for the receiving server, so upload benchmarks measure the client and not the network.
+
+Serves GET /kyber-public-key (with an ETag, answering If-None-Match with 304) and accepts POSTs to
+/secure-ecg and /receive-hl7 (JSON, binary or chunked bodies), reading and discarding the body.
+"""
+
+import http.server
+import threading
+
+from smaj_kyber import keygen, set_mode
+
+
+class StubServer:
+
+    def __init__(self, host="127.0.0.1", port=0):
+        set_mode("512")
+        self.public_key, self.secret_key = keygen()
+        self.received = 0
+        self.received_bytes = 0
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if self.path != "/kyber-public-key":
+                    return self._reply(404, b"not found")
+                if self.headers.get("If-None-Match") == '"stub-key"':
+                    return self._reply(304, b"")
+                self._reply(200, server.public_key, {"ETag": '"stub-key"'})
+
+            def do_POST(self):
+                size = 0
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    while True:
+                        length = int(self.rfile.readline().split(b";")[0], 16)
+                        size += len(self.rfile.read(length))
+                        self.rfile.readline()
+                        if length == 0:
+                            break
+                else:
+                    size = len(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                server.received += 1
+                server.received_bytes += size
+                self._reply(200, b'{"status": "received"}', {"Content-Type": "application/json"})
+
+            def _reply(self, status, body, headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_port}"
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="stub-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
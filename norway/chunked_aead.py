@@ -0,0 +1,190 @@
+"""
+Chunked Ascon-AEAD128 container for large ECG files.
+
+Layout:
+    header:  magic "ASCK" | version (1 byte) | 3 reserved bytes | chunk size (uint32, big endian) | base nonce (16 bytes)
+    chunks:  ascon_encrypt() output of every plaintext chunk (chunk size + 16 bytes, the last one may be shorter)
+
+Chunk i is encrypted with the base nonce whose last 8 bytes are XORed with the counter i, and with
+associated data header | counter (uint64) | final flag (1 byte) | caller's associated data.
+The final flag is only set on the last chunk, so dropping trailing chunks makes verification fail.
+Every chunk can be verified and decrypted on its own, either in parallel or by seeking to it.
+"""
+
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+from pyascon.ascon import ascon_encrypt, ascon_decrypt
+
+MAGIC = b"ASCK"
+VERSION = 1
+HEADER_FORMAT = ">4sB3xI16s"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+TAG_SIZE = 16
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+# === Header and per-chunk parameters ===
+
+def pack_header(chunk_size, nonce):
+    """Header: magic "ASCK" | version (uint8) | 3 reserved | chunk size (uint32) | base nonce (16 bytes), big endian."""
+    assert 0 < chunk_size < 2 ** 32 and len(nonce) == 16
+    return struct.pack(HEADER_FORMAT, MAGIC, VERSION, chunk_size, nonce)
+
+
+def unpack_header(header):
+    """Return (chunk_size, base_nonce) of a container header."""
+    if len(header) < HEADER_SIZE:
+        raise ValueError("Truncated container header")
+    magic, version, chunk_size, nonce = struct.unpack_from(HEADER_FORMAT, header)
+    if magic != MAGIC:
+        raise ValueError("Not a chunked Ascon container")
+    if version != VERSION:
+        raise ValueError(f"Unsupported container version {version}")
+    return chunk_size, nonce
+
+
+def chunk_nonce(base_nonce, index):
+    """Nonce of chunk index: the base nonce with its last 8 bytes (big-endian counter) XORed with index."""
+    counter = int.from_bytes(base_nonce[8:], "big") ^ index
+    return base_nonce[:8] + counter.to_bytes(8, "big")
+
+
+def chunk_associated_data(header, index, final, associateddata):
+    return header[:HEADER_SIZE] + struct.pack(">QB", index, int(final)) + associateddata
+
+
+def _encrypt_chunk(args):
+    key, header, associateddata, index, final, chunk = args
+    nonce = chunk_nonce(header[-16:], index)
+    return ascon_encrypt(key, nonce, chunk_associated_data(header, index, final, associateddata), chunk)
+
+
+def _decrypt_chunk(args):
+    key, header, associateddata, index, final, chunk = args
+    if len(chunk) < TAG_SIZE:
+        return None
+    nonce = chunk_nonce(header[-16:], index)
+    return ascon_decrypt(key, nonce, chunk_associated_data(header, index, final, associateddata), chunk)
+
+
+def _map(function, jobs, workers, executor):
+    """Run the chunk jobs inline, on the given executor, or on a temporary process pool."""
+    if executor is not None:
+        return list(executor.map(function, jobs))
+    if workers == 1 or len(jobs) <= 1:
+        return [function(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(function, jobs))
+
+
+# === In-memory encoding / decoding ===
+
+def encrypt_chunked(key, nonce, plaintext, associateddata=b"", chunk_size=DEFAULT_CHUNK_SIZE,
+                    workers=None, executor=None):
+    """
+    Encrypt plaintext into the chunked container format.
+    workers: number of processes (None = one per core, 1 = no pool); executor: an existing pool to use instead
+    """
+    header = pack_header(chunk_size, nonce)
+    nchunks = max(1, -(-len(plaintext) // chunk_size))
+    jobs = [(key, header, associateddata, i, i == nchunks - 1, bytes(plaintext[i * chunk_size:(i + 1) * chunk_size]))
+            for i in range(nchunks)]
+    return header + b"".join(_map(_encrypt_chunk, jobs, workers, executor))
+
+
+def decrypt_chunked(key, data, associateddata=b"", workers=None, executor=None):
+    """Decrypt a whole container. Returns the plaintext or None if any chunk fails verification."""
+    chunk_size, _ = unpack_header(data)
+    header = bytes(data[:HEADER_SIZE])
+    frame = chunk_size + TAG_SIZE
+    body = len(data) - HEADER_SIZE
+    nchunks = -(-body // frame)
+    if nchunks == 0:
+        return None
+    jobs = [(key, header, associateddata, i, i == nchunks - 1,
+             bytes(data[HEADER_SIZE + i * frame:HEADER_SIZE + (i + 1) * frame]))
+            for i in range(nchunks)]
+    chunks = _map(_decrypt_chunk, jobs, workers, executor)
+    if any(chunk is None for chunk in chunks):
+        return None
+    return b"".join(chunks)
+
+
+# === Random access ===
+
+def count_chunks(fileobj):
+    """Return the number of chunks of a container opened in binary mode (and rewind it)."""
+    fileobj.seek(0, os.SEEK_END)
+    body = fileobj.tell() - HEADER_SIZE
+    fileobj.seek(0)
+    chunk_size, _ = unpack_header(fileobj.read(HEADER_SIZE))
+    fileobj.seek(0)
+    return max(0, -(-body // (chunk_size + TAG_SIZE)))
+
+
+def read_chunk(fileobj, key, index, associateddata=b""):
+    """Verify and decrypt chunk `index` of a container opened in binary mode. Returns None on failure."""
+    nchunks = count_chunks(fileobj)
+    if not 0 <= index < nchunks:
+        raise IndexError(f"Chunk {index} out of range (container has {nchunks} chunks)")
+    header = fileobj.read(HEADER_SIZE)
+    chunk_size, _ = unpack_header(header)
+    frame = chunk_size + TAG_SIZE
+    fileobj.seek(HEADER_SIZE + index * frame)
+    chunk = fileobj.read(frame)
+    return _decrypt_chunk((key, header, associateddata, index, index == nchunks - 1, chunk))
+
+
+# === Files ===
+
+def encrypt_file(key, nonce, src_path, dst_path, associateddata=b"", chunk_size=DEFAULT_CHUNK_SIZE, workers=None):
+    """Encrypt a file chunk batch by chunk batch, so memory stays bounded for long recordings."""
+    workers = workers or os.cpu_count() or 1
+    batch = workers * 4
+    header = pack_header(chunk_size, nonce)
+    total = os.path.getsize(src_path)
+    nchunks = max(1, -(-total // chunk_size))
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and nchunks > 1 else None
+    try:
+        with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+            dst.write(header)
+            for first in range(0, nchunks, batch):
+                jobs = [(key, header, associateddata, i, i == nchunks - 1, src.read(chunk_size))
+                        for i in range(first, min(first + batch, nchunks))]
+                for chunk in _map(_encrypt_chunk, jobs, 1, pool):
+                    dst.write(chunk)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def decrypt_file(key, src_path, dst_path, associateddata=b"", workers=None):
+    """Decrypt a container file. Returns False (and removes dst_path) if any chunk fails verification."""
+    workers = workers or os.cpu_count() or 1
+    batch = workers * 4
+    with open(src_path, "rb") as src:
+        nchunks = count_chunks(src)
+        header = src.read(HEADER_SIZE)
+        chunk_size, _ = unpack_header(header)
+        frame = chunk_size + TAG_SIZE
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and nchunks > 1 else None
+        ok = nchunks > 0
+        try:
+            with open(dst_path, "wb") as dst:
+                for first in range(0, nchunks if ok else 0, batch):
+                    jobs = [(key, header, associateddata, i, i == nchunks - 1, src.read(frame))
+                            for i in range(first, min(first + batch, nchunks))]
+                    chunks = _map(_decrypt_chunk, jobs, 1, pool)
+                    if any(chunk is None for chunk in chunks):
+                        ok = False
+                        break
+                    for chunk in chunks:
+                        dst.write(chunk)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+    if not ok:
+        os.remove(dst_path)
+    return ok
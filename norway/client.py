@@ -2,6 +2,7 @@ import wfdb
 import pandas as pd
 import numpy as np
 import requests
+import transport
 from pyascon import ascon
 from smaj_kyber import encapsulate, set_mode
 from pyascon.ascon import ascon_encrypt
@@ -12,10 +13,11 @@ base_url="http://192.168.223.105:5000"
 
 # === Kyber Setup ===
 set_mode("512")
+http = transport.get_transport()
 
 # === Step 1: Download Server Public Key ===
 try:
-    resp = requests.get(f"{base_url}/kyber-public-key", timeout=5)
+    resp = http.get(f"{base_url}/kyber-public-key")
     resp.raise_for_status()
     server_pk = resp.content
     print("[INFO] Received Kyber public key from server.")
@@ -75,8 +77,9 @@ headers = {
 }
 
 try:
-    r = requests.post(f"{base_url}/secure-ecg", data=hl7, headers=headers)
+    r = http.post(f"{base_url}/secure-ecg", data=hl7, headers=headers)
     print("Status Code:", r.status_code)
     print("Server response:", r.text)
+    print("Latency:", http.stats())
 except requests.exceptions.RequestException as e:
     print("[CLIENT ERROR]", e)
@@ -0,0 +1,207 @@
+"""
+Columnar cache of a whole WFDB directory: one int16 .npy array per record plus index.json.
+
+    <store>/index.json    fs, sample count, gains, baselines, lead names, units, the #SL12/#C diagnoses
+                          and the SHA-256 of the source .hea/.dat files of every record
+    <store>/<record>.npy  the (n_samples, n_leads) ADC matrix, opened with np.load(mmap_mode="r")
+
+build() verifies the source files against the dataset's SHA256SUMS.txt and only converts records
+whose .hea/.dat changed (size or mtime) since the last build, so an up-to-date store opens in
+milliseconds instead of re-reading every record with wfdb.rdsamp.
+
+usage: python dataset_store.py <WFDB directory> [store directory]
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import ecg_codec
+import wfdb_memmap
+
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+CHECKSUM_FILE = "SHA256SUMS.txt"
+DEFAULT_STORE_DIR = "npy_store"
+
+
+def default_store_dir(directory):
+    return os.path.join(directory, DEFAULT_STORE_DIR)
+
+
+# === Build ===
+
+def read_checksums(directory):
+    """{file name: sha256 hex} from SHA256SUMS.txt ({} if the dataset has none)."""
+    path = os.path.join(directory, CHECKSUM_FILE)
+    if not os.path.exists(path):
+        return {}
+    checksums = {}
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 2:
+                checksums[parts[1].lstrip("*")] = parts[0]
+    return checksums
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def record_names(directory):
+    path = os.path.join(directory, "RECORDS")
+    if os.path.exists(path):
+        with open(path) as f:
+            return [line.strip() for line in f if line.strip()]
+    return sorted(name[:-4] for name in os.listdir(directory) if name.endswith(".hea"))
+
+
+def parse_diagnoses(comments):
+    """["SL12: Sinus rhythm", "C: Normal ECG"] -> {"SL12": "Sinus rhythm", "C": "Normal ECG"}"""
+    diagnoses = {}
+    for comment in comments:
+        label, sep, text = comment.partition(":")
+        if sep and label.strip() in ("SL12", "C"):
+            diagnoses[label.strip()] = " ".join(text.split())
+    return diagnoses
+
+
+def _source_state(directory, name):
+    state = {}
+    for ext in ("hea", "dat"):
+        stat = os.stat(os.path.join(directory, f"{name}.{ext}"))
+        state[ext] = [stat.st_size, stat.st_mtime_ns]
+    return state
+
+
+def build(directory, store_dir=None, verify=True):
+    """
+    Create or update the store for a WFDB directory and return its index.
+    Raises ValueError if verify is set and a source file does not match SHA256SUMS.txt.
+    """
+    store_dir = store_dir or default_store_dir(directory)
+    os.makedirs(store_dir, exist_ok=True)
+    index_path = os.path.join(store_dir, INDEX_NAME)
+    index = _read_index(index_path) or {"version": INDEX_VERSION, "records": {}}
+    checksums = read_checksums(directory) if verify else {}
+
+    names = record_names(directory)
+    converted = []
+    for name in names:
+        state = _source_state(directory, name)
+        entry = index["records"].get(name)
+        if (entry is not None and entry["source_state"] == state
+                and os.path.exists(os.path.join(store_dir, entry["file"]))):
+            continue
+
+        sha256 = {ext: sha256_file(os.path.join(directory, f"{name}.{ext}")) for ext in ("hea", "dat")}
+        for ext, digest in sha256.items():
+            expected = checksums.get(f"{name}.{ext}")
+            if verify and expected is not None and expected != digest:
+                raise ValueError(f"{name}.{ext} does not match {CHECKSUM_FILE}")
+
+        record = wfdb_memmap.MemmapRecord(os.path.join(directory, name))
+        file_name = f"{name}.npy"
+        tmp_path = os.path.join(store_dir, file_name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(record.adc, dtype="<i2"))
+        os.replace(tmp_path, os.path.join(store_dir, file_name))
+
+        index["records"][name] = {
+            "file": file_name,
+            "fs": record.fs,
+            "n_samples": record.n_samples,
+            "sig_name": record.sig_name,
+            "lead_names": [ecg_codec.LEAD_CASE_FIX.get(lead, lead) for lead in record.sig_name],
+            "units": record.units,
+            "gains": record.gains,
+            "baselines": record.baselines,
+            "comments": record.comments,
+            "diagnoses": parse_diagnoses(record.comments),
+            "sha256": sha256,
+            "source_state": state,
+        }
+        converted.append(name)
+
+    removed = sorted(set(index["records"]) - set(names))
+    for name in removed:
+        path = os.path.join(store_dir, index["records"].pop(name)["file"])
+        if os.path.exists(path):
+            os.remove(path)
+
+    index["records"] = {name: index["records"][name] for name in names}
+    if converted or removed or not os.path.exists(index_path):
+        index["built_at"] = time.time()
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp_path, index_path)
+    index["converted"] = converted
+    return index
+
+
+def _read_index(index_path):
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path) as f:
+        index = json.load(f)
+    return index if index.get("version") == INDEX_VERSION else None
+
+
+# === Loading ===
+
+class DatasetStore:
+    """Read side of a built store; sample arrays are memory-mapped on first access."""
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        index = _read_index(os.path.join(store_dir, INDEX_NAME))
+        if index is None:
+            raise FileNotFoundError(f"No dataset store in {store_dir} (run dataset_store.build first)")
+        self.index = index["records"]
+        self.names = list(self.index)
+        self._arrays = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def meta(self, name):
+        return self.index[name]
+
+    def adc(self, name):
+        """(n_samples, n_leads) int16 memmap of a record."""
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.store_dir, self.index[name]["file"]), mmap_mode="r")
+        return self._arrays[name]
+
+    def physical(self, name):
+        """Signals of a record in mV, as returned by wfdb.rdsamp."""
+        meta = self.index[name]
+        return ecg_codec.to_physical(self.adc(name), meta["gains"], meta["baselines"])
+
+    def stack(self, physical=True):
+        """All records as one (n_records, n_samples, n_leads) array (records must have equal lengths)."""
+        return np.stack([self.physical(name) if physical else self.adc(name) for name in self.names])
+
+
+def open_store(directory, store_dir=None, verify=True):
+    """Build (or incrementally update) the store for a WFDB directory and open it."""
+    store_dir = store_dir or default_store_dir(directory)
+    build(directory, store_dir, verify)
+    return DatasetStore(store_dir)
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    result = build(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    print(f"{len(result['records'])} records, {len(result['converted'])} converted "
+          f"in {time.perf_counter() - start:.3f} s")
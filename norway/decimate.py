@@ -0,0 +1,113 @@
+"""
+Decimation of ECG leads for plotting: reduce each lead to about as many points as the plot has pixels.
+
+Both methods return sample indices (one column per lead), so callers pick the matching times and
+values themselves and can apply them to the raw or calibrated signal:
+
+    minmax  the minimum and maximum of every bucket, in time order; keeps every peak (QRS complexes,
+            spikes) exactly and is fully vectorized
+    lttb    Largest-Triangle-Three-Buckets: one point per bucket, the one forming the largest triangle
+            with the previous pick and the next bucket's mean; smoother look, vectorized across leads
+"""
+
+import numpy as np
+
+METHODS = ("minmax", "lttb")
+
+
+def _buckets(n, n_buckets):
+    """Pad length and bucket size so that n samples split into n_buckets equal buckets."""
+    size = -(-n // n_buckets)
+    return size * n_buckets - n, size
+
+
+def minmax_indices(y, n_out):
+    """Indices of the per-bucket minima and maxima of y ((n,) or (n, leads)), at most n_out per lead."""
+    y = np.asarray(y)
+    squeeze = y.ndim == 1
+    y = y[:, None] if squeeze else y
+    n = len(y)
+    n_buckets = max(1, n_out // 2)
+    if n <= n_out:
+        idx = np.repeat(np.arange(n)[:, None], y.shape[1], axis=1)
+        return idx[:, 0] if squeeze else idx
+
+    pad, size = _buckets(n, n_buckets)
+    # Pad with the last sample so padding never wins over a real extreme of a different value
+    padded = np.concatenate([y, np.repeat(y[-1:], pad, axis=0)]) if pad else y
+    blocks = padded.reshape(n_buckets, size, -1)
+    # NaN (missing samples) must not be picked as extremes
+    filled_min = np.where(np.isnan(blocks), np.inf, blocks) if blocks.dtype.kind == "f" else blocks
+    filled_max = np.where(np.isnan(blocks), -np.inf, blocks) if blocks.dtype.kind == "f" else blocks
+    offsets = np.arange(n_buckets)[:, None] * size
+    lo = np.minimum(filled_min.argmin(axis=1) + offsets, n - 1)
+    hi = np.minimum(filled_max.argmax(axis=1) + offsets, n - 1)
+    idx = np.stack([np.minimum(lo, hi), np.maximum(lo, hi)], axis=1).reshape(2 * n_buckets, -1)
+    return idx[:, 0] if squeeze else idx
+
+
+def minmax_shared(y, n_out):
+    """
+    Per-bucket min/max of every lead on one set of sample positions shared by all leads (for plots with
+    a single x array). Returns (positions, values): values[k] is the k-th extreme of each lead in time
+    order, drawn at the bucket's start or middle, so times are off by less than one bucket.
+    """
+    y = np.asarray(y)
+    y = y[:, None] if y.ndim == 1 else y
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n), y
+    n_buckets = max(1, n_out // 2)
+    _, size = _buckets(n, n_buckets)
+    idx = minmax_indices(y, n_out)
+    starts = np.arange(n_buckets) * size
+    positions = np.minimum(np.stack([starts, starts + size // 2], axis=1).reshape(-1), n - 1)
+    return positions, y[idx, np.arange(y.shape[1])]
+
+
+def lttb_indices(y, n_out, x=None):
+    """Largest-Triangle-Three-Buckets indices of y ((n,) or (n, leads)), n_out per lead (first and last kept)."""
+    y = np.asarray(y, dtype=np.float64)
+    squeeze = y.ndim == 1
+    y = y[:, None] if squeeze else y
+    n, leads = y.shape
+    if n <= n_out or n_out < 3:
+        idx = np.repeat(np.arange(n)[:, None], leads, axis=1)
+        return idx[:, 0] if squeeze else idx
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+    y = np.nan_to_num(y)
+
+    # Inner points split into n_out - 2 buckets (first and last points are always kept)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    idx = np.empty((n_out, leads), dtype=np.int64)
+    idx[0] = 0
+    idx[-1] = n - 1
+    columns = np.arange(leads)
+    prev = np.zeros(leads, dtype=np.int64)
+    for b in range(n_out - 2):
+        start, stop = edges[b], edges[b + 1]
+        if b + 2 < len(edges):
+            next_x = x[stop:edges[b + 2]].mean()
+            next_y = y[stop:edges[b + 2]].mean(axis=0)
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+        prev_x, prev_y = x[prev], y[prev, columns]
+        # Twice the triangle area for every candidate (rows) and lead (columns)
+        area = np.abs((prev_x - next_x) * (y[start:stop] - prev_y)
+                      - (prev_x[None, :] - x[start:stop, None]) * (next_y - prev_y))
+        prev = start + area.argmax(axis=0)
+        idx[b + 1] = prev
+    return idx[:, 0] if squeeze else idx
+
+
+def decimate(y, n_out, method="minmax", x=None):
+    """Indices of the points to plot; method "none" keeps every sample."""
+    if method == "minmax":
+        return minmax_indices(y, n_out)
+    if method == "lttb":
+        return lttb_indices(y, n_out, x)
+    if method == "none":
+        y = np.asarray(y)
+        idx = np.arange(len(y))
+        return idx if y.ndim == 1 else np.repeat(idx[:, None], y.shape[1], axis=1)
+    raise ValueError(f"Unknown decimation method {method!r} (choose from {', '.join(METHODS)} or none)")
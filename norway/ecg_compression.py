@@ -0,0 +1,128 @@
+"""
+Lossless compression stage applied to the ECG payload before Ascon encryption.
+
+ecg_codec payloads get a per-lead delta encoding of the int16 ADC samples (first or second order,
+with int16 wrap-around so it is exactly reversible), stored lead by lead, followed by a general
+purpose codec. Other payloads (e.g. JSON) are passed to the codec unchanged.
+
+Header (16 bytes, bound into the Ascon associated data):
+    magic "ECGZ" | version (uint8) | codec id (uint8) | delta order (uint8) | reserved (uint8)
+    | prefix length (uint32) | raw length (uint32)
+"""
+
+import lzma
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+import ecg_codec
+
+MAGIC = b"ECGZ"
+VERSION = 1
+HEADER_FORMAT = "<4sBBBxII"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# name -> (id, compress, decompress)
+CODECS = {
+    "none": (0, bytes, bytes),
+    "zlib": (1, lambda data: zlib.compress(data, 9), zlib.decompress),
+    "lzma": (2, lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+CODEC_NAMES = {codec_id: name for name, (codec_id, _, _) in CODECS.items()}
+
+
+# === Delta coding ===
+
+def delta_encode(adc, order):
+    """Per-lead delta coding of an (n_samples, n_leads) int16 matrix; returns lead-major residuals."""
+    residuals = np.array(adc, dtype=np.int16)
+    for _ in range(order):
+        residuals[1:] = residuals[1:] - residuals[:-1]
+    return np.ascontiguousarray(residuals.T)
+
+
+def delta_decode(residuals, order):
+    """Inverse of delta_encode; takes lead-major residuals and returns an (n_samples, n_leads) matrix."""
+    adc = np.array(residuals.T, dtype=np.int16)
+    for _ in range(order):
+        adc = np.cumsum(adc, axis=0, dtype=np.int16)
+    return adc
+
+
+# === Compression stage ===
+
+def compress(payload, codec="zlib", delta_order=1):
+    """
+    Compress a payload.
+    Returns (header, body, stats); header must be passed to the receiver (and is used as associated data).
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unknown compression codec {codec!r} (choose from {', '.join(CODECS)})")
+    start = time.perf_counter()
+    codec_id, encoder, _ = CODECS[codec]
+    if delta_order and payload[:4] == ecg_codec.MAGIC:
+        adc, meta = ecg_codec.decode(payload)
+        prefix_len = len(payload) - adc.nbytes
+        raw = bytes(payload[:prefix_len]) + delta_encode(adc, delta_order).astype("<i2").tobytes()
+    else:
+        delta_order = 0
+        prefix_len = len(payload)
+        raw = payload
+    body = encoder(raw)
+    header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, codec_id, delta_order, prefix_len, len(raw))
+    encode_time = time.perf_counter() - start
+
+    stats = {
+        "codec": codec,
+        "delta_order": delta_order,
+        "raw_bytes": len(payload),
+        "compressed_bytes": len(body),
+        "ratio": round(len(payload) / max(1, len(body)), 3),
+        "encode_ms": round(encode_time * 1000, 3),
+    }
+    return header, body, stats
+
+
+def decompress(header, body):
+    """Inverse of compress(); raises ValueError for malformed headers or bodies."""
+    if len(header) != HEADER_SIZE:
+        raise ValueError("Malformed compression header")
+    magic, version, codec_id, delta_order, prefix_len, raw_len = struct.unpack(HEADER_FORMAT, header)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Unsupported compression header")
+    if codec_id not in CODEC_NAMES:
+        raise ValueError(f"Unknown compression codec id {codec_id}")
+    _, _, decoder = CODECS[CODEC_NAMES[codec_id]]
+    raw = decoder(body)
+    if len(raw) != raw_len:
+        raise ValueError("Decompressed length does not match the header")
+    if delta_order == 0:
+        return raw
+
+    prefix = raw[:prefix_len]
+    meta, _ = ecg_codec.decode_header(prefix)
+    residuals = np.frombuffer(raw, dtype="<i2", offset=prefix_len).reshape(meta["n_leads"], meta["n_samples"])
+    return prefix + delta_decode(residuals, delta_order).astype("<i2").tobytes()
+
+
+def compare_codecs(payload, delta_orders=(0, 1, 2)):
+    """Compress a payload with every codec and delta order, to pick the codec for a deployment."""
+    results = []
+    for codec in CODECS:
+        for order in delta_orders:
+            header, body, stats = compress(payload, codec, order)
+            if stats["delta_order"] == order:
+                results.append(stats)
+    return results
+
+
+if __name__ == "__main__":
+    # usage: python ecg_compression.py <WFDB record path> [...]
+    for record_path in sys.argv[1:]:
+        print(record_path)
+        for stats in compare_codecs(ecg_codec.encode_wfdb(record_path)):
+            print("  {codec:5s} delta={delta_order}  {raw_bytes:8d} -> {compressed_bytes:8d} bytes"
+                  "  ratio {ratio:6.2f}  {encode_ms:8.1f} ms".format(**stats))
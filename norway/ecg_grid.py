@@ -0,0 +1,31 @@
+"""
+ECG paper grid for Plotly figures, drawn with axis gridlines instead of one layout shape per line.
+
+The small squares (0.2 s x 0.5 mV by default) are the axes' minor gridlines and the labelled ticks
+(every second / every 1 mV, or the lead offsets when the y ticks are an explicit array) are major
+gridlines in the same color. That is a fixed number of layout objects whatever the recording length,
+and the browser does not re-layout hundreds of shapes on every pan or zoom.
+"""
+
+GRID_COLOR = 'rgba(255, 0, 0, 0.5)'
+GRID_WIDTH = 0.8
+X_STEP = 0.2  # seconds
+Y_STEP = 0.5  # mV
+X_LABEL_STEP = 1.0
+Y_LABEL_STEP = 1.0
+
+
+def apply_ecg_grid(fig, x_range, y_range, color=GRID_COLOR, width=GRID_WIDTH, x_step=X_STEP, y_step=Y_STEP):
+    """Draw the grid over x_range (seconds) and y_range (mV) and fix the axes to those ranges."""
+    line = dict(showgrid=True, gridcolor=color, gridwidth=width)
+    minor = dict(tick0=0, showgrid=True, gridcolor=color, gridwidth=width, ticks="")
+
+    xaxis = dict(range=list(x_range), tick0=0, dtick=X_LABEL_STEP, zeroline=False,
+                 minor=dict(minor, dtick=x_step), **line)
+    yaxis = dict(range=list(y_range), zeroline=False, minor=dict(minor, dtick=y_step), **line)
+    # Keep explicit tick labels (e.g. lead names at their offsets); they sit on the grid already
+    if fig.layout.yaxis.tickmode != 'array':
+        yaxis.update(tick0=0, dtick=Y_LABEL_STEP)
+
+    fig.update_layout(xaxis=xaxis, yaxis=yaxis)
+    return fig
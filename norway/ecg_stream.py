@@ -0,0 +1,444 @@
+"""
+Streaming ECG ingestion: fixed-duration windows encrypted and pushed as they are captured.
+
+Instead of waiting for a whole 10 s recording, a producer yields windows (e.g. 1 s x 12 leads) from
+  - a WFDB record (wfdb_windows, optionally looped to emulate a continuous device),
+  - a CSV replay of physical values in mV such as ecg_output.csv (csv_windows),
+  - a synthetic PQRST generator (synthetic_windows).
+Every window is encoded with ecg_codec, compressed, encrypted under a Kyber session with the
+per-message key and sequence-numbered nonce of kyber_session.py, and sent as one binary WebSocket
+message over a persistent connection to GET /stream-ecg. The receiver acknowledges each window and
+the sender reports the end-to-end latency: from the moment the window's last sample was captured
+until its acknowledgement arrived.
+
+Frames (big endian):
+    OPEN    magic "ECGS" | version (uint8) | type 1 | athlete id (uint32) | session id (16 bytes),
+            then the Kyber ciphertext; starts a session (again whenever the session expires)
+    WINDOW  magic "ECGS" | version (uint8) | type 2 | athlete id (uint32) | session id (16 bytes) |
+            seq (uint64) | first sample (uint64), then the ecg_compression header and the ciphertext;
+            the fixed header and the compression header are the associated data
+Acknowledgements are JSON text messages: {"type": "window", "seq": ..., "status": "ok", ...}.
+
+usage: python ecg_stream.py serve [--port 8765]
+       python ecg_stream.py send [--source synthetic|csv|wfdb] [--path FILE] [--window 1.0] [--duration 10]
+                                 [--server URL] [--fast]
+       send without --server starts the stand-in receiver in-process.
+"""
+
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import lzma
+import os
+import struct
+import time
+import zlib
+
+import aiohttp
+import numpy as np
+from aiohttp import web
+from smaj_kyber import decapsulate, keygen, set_mode
+
+import ecg_codec
+import ecg_compression
+import kyber_session
+import metrics
+import record_store
+from pyascon.ascon import AsconKey, ascon_decrypt, ascon_encrypt
+
+STREAM_MAGIC = b"ECGS"
+STREAM_VERSION = 1
+OPEN, WINDOW = 1, 2
+OPEN_FORMAT = ">4sBBI16s"
+WINDOW_FORMAT = ">4sBBI16sQQ"
+OPEN_SIZE = struct.calcsize(OPEN_FORMAT)
+WINDOW_SIZE = struct.calcsize(WINDOW_FORMAT)
+ASCON_TAG_BYTES = 16
+# Failures of a single frame (malformed, forged or undecodable): answered with an error ack, the stream goes on
+FRAME_ERRORS = (ValueError, KeyError, struct.error, zlib.error, lzma.LZMAError)
+
+WINDOW_SECONDS = float(os.getenv("ECG_STREAM_WINDOW", "1.0"))
+STREAM_COMPRESSION = os.getenv("ECG_STREAM_COMPRESSION", "zlib")
+SYNTHETIC_FS = 500
+SYNTHETIC_LEADS = ["I", "II", "III", "aVR", "aVL", "aVF", "V1", "V2", "V3", "V4", "V5", "V6"]
+# CSV values are in mV; stored as int16 in uV
+CSV_GAIN = 1000.0
+ACK_TIMEOUT = 30.0
+
+log = metrics.get_logger("stream")
+
+
+# === Windows ===
+
+class Window:
+    """One block of int16 samples (n_samples, n_leads) starting at sample `first`, with its calibration."""
+
+    def __init__(self, first, adc, fs, gains, baselines, lead_names):
+        self.first = first
+        self.adc = adc
+        self.fs = fs
+        self.gains = gains
+        self.baselines = baselines
+        self.lead_names = lead_names
+
+    @property
+    def end(self):
+        """Index one past the last sample; the window is complete once that sample time has passed."""
+        return self.first + len(self.adc)
+
+    def payload(self):
+        return ecg_codec.encode(self.adc, self.fs, self.gains, self.baselines, self.lead_names)
+
+
+def wfdb_windows(record_path, seconds=WINDOW_SECONDS, loop=False):
+    """Windows of a WFDB record (through the shared record store); loop=True replays it endlessly."""
+    record = record_store.get_store().get(record_path)
+    size = max(1, round(seconds * record.fs))
+    offset = 0
+    while True:
+        for start in range(0, record.n_samples, size):
+            yield Window(offset + start, record.adc[start:start + size], record.fs, record.gains,
+                         record.baselines, record.lead_names)
+        if not loop or not record.n_samples:
+            return
+        offset += record.n_samples
+
+
+def csv_windows(path, seconds=WINDOW_SECONDS, fs=None, gain=CSV_GAIN):
+    """
+    Replay a CSV of physical values (one column per lead, an optional leading time column), read row by row.
+    fs defaults to the rate implied by the time column, else 500 Hz. Empty cells become missing samples.
+    """
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        columns = next(reader)
+        has_time = columns[0].strip().lower().startswith("time")
+        lead_names = [ecg_codec.LEAD_CASE_FIX.get(name.strip(), name.strip()) for name in columns[has_time:]]
+        gains, baselines = [gain] * len(lead_names), [0] * len(lead_names)
+        head = [next(reader, None), next(reader, None)]
+        if fs is None:
+            fs = 1 / (float(head[1][0]) - float(head[0][0])) if has_time and head[1] else SYNTHETIC_FS
+        size = max(1, round(seconds * fs))
+
+        rows, first = [], 0
+        for row in itertools.chain((row for row in head if row), reader):
+            rows.append([round(float(value) * gain) if value else ecg_codec.DIGITAL_NAN for value in row[has_time:]])
+            if len(rows) == size:
+                yield Window(first, np.array(rows, dtype="<i2"), fs, gains, baselines, lead_names)
+                first += size
+                rows = []
+        if rows:
+            yield Window(first, np.array(rows, dtype="<i2"), fs, gains, baselines, lead_names)
+
+
+def synthetic_beat(t, lead):
+    """A rough PQRST complex in mV at times t (seconds from the R peak), scaled and inverted per lead."""
+    waves = ((-0.2, 0.025, 0.12), (-0.03, 0.01, -0.15), (0.0, 0.012, 1.2), (0.03, 0.01, -0.25), (0.25, 0.04, 0.3))
+    signal = sum(amplitude * np.exp(-((t - centre) / width) ** 2 / 2) for centre, width, amplitude in waves)
+    scale = {"aVR": -0.6, "aVL": 0.3, "III": 0.5, "V1": -0.5, "V2": 0.4, "V3": 0.8}.get(lead, 1.0)
+    return scale * signal
+
+
+def synthetic_windows(seconds=WINDOW_SECONDS, fs=SYNTHETIC_FS, heart_rate=60.0, duration=None,
+                      lead_names=SYNTHETIC_LEADS, noise=0.01, seed=0):
+    """Endless (or `duration` seconds of) synthetic 12-lead ECG at fs, heart_rate beats per minute."""
+    rng = np.random.default_rng(seed)
+    size = max(1, round(seconds * fs))
+    total = round(duration * fs) if duration is not None else None
+    period = 60.0 / heart_rate
+    gains, baselines = [CSV_GAIN] * len(lead_names), [0] * len(lead_names)
+    first = 0
+    while total is None or first < total:
+        n = size if total is None else min(size, total - first)
+        t = (first + np.arange(n)) / fs
+        # Time relative to the nearest R peak (peaks at period/2, 3 period/2, ...)
+        phase = (t % period) - period / 2
+        signals = np.column_stack([synthetic_beat(phase, lead) for lead in lead_names])
+        signals += rng.normal(0, noise, signals.shape)
+        yield Window(first, np.round(signals * CSV_GAIN).astype("<i2"), fs, gains, baselines, lead_names)
+        first += n
+
+
+# === Frames ===
+
+def pack_open(athlete_id, session):
+    return struct.pack(OPEN_FORMAT, STREAM_MAGIC, STREAM_VERSION, OPEN, athlete_id, session.session_id) + \
+        session.kyber_ciphertext
+
+
+def encrypt_window(athlete_id, session_id, seq, key, nonce, window, codec=STREAM_COMPRESSION):
+    """Return the WINDOW frame for window, encrypted with the message key and nonce of seq."""
+    compression_header, plaintext, _ = ecg_compression.compress(window.payload(), codec)
+    header = struct.pack(WINDOW_FORMAT, STREAM_MAGIC, STREAM_VERSION, WINDOW, athlete_id, session_id, seq,
+                         window.first)
+    associateddata = header + compression_header
+    metrics.count_bytes("plaintext", len(plaintext))
+    return associateddata + ascon_encrypt(key, nonce, associateddata, plaintext)
+
+
+def unpack_frame(frame):
+    """Return (type, fields): OPEN fields are (athlete id, session id, kyber ciphertext),
+    WINDOW fields are (athlete id, session id, seq, first sample, associated data, ciphertext)."""
+    if len(frame) < OPEN_SIZE:
+        raise ValueError("Truncated stream frame")
+    magic, version, frame_type = struct.unpack_from(">4sBB", frame)
+    if magic != STREAM_MAGIC or version != STREAM_VERSION:
+        raise ValueError("Not an ECG stream frame")
+    if frame_type == OPEN:
+        _, _, _, athlete_id, session_id = struct.unpack_from(OPEN_FORMAT, frame)
+        return OPEN, (athlete_id, session_id, frame[OPEN_SIZE:])
+    if frame_type == WINDOW:
+        if len(frame) < WINDOW_SIZE + ecg_compression.HEADER_SIZE:
+            raise ValueError("Truncated stream frame")
+        _, _, _, athlete_id, session_id, seq, first = struct.unpack_from(WINDOW_FORMAT, frame)
+        ad_size = WINDOW_SIZE + ecg_compression.HEADER_SIZE
+        return WINDOW, (athlete_id, session_id, seq, first, frame[:ad_size], frame[ad_size:])
+    raise ValueError(f"Unknown stream frame type {frame_type}")
+
+
+# === Receiving side ===
+
+class StreamReceiver:
+    """
+    Decrypts the frames of stream connections with the server's Kyber secret key.
+    on_window(athlete_id, first_sample, adc, meta) is called for every decrypted window (e.g. to store it).
+    """
+
+    def __init__(self, secret_key, on_window=None):
+        self.secret_key = secret_key
+        self.on_window = on_window
+        self.windows = 0
+        self.errors = 0
+
+    def open(self, kyber_ciphertext, session_id):
+        """Return the shared secret of a new session (the session id must match the ciphertext)."""
+        if len(kyber_ciphertext) != kyber_session.CIPHERTEXT_BYTES:
+            raise ValueError(f"Kyber ciphertext must be {kyber_session.CIPHERTEXT_BYTES} bytes")
+        if kyber_session.derive_session_id(kyber_ciphertext) != session_id:
+            raise ValueError("Session id does not match the Kyber ciphertext")
+        return decapsulate(kyber_ciphertext, self.secret_key)
+
+    def decrypt(self, shared_secret, session_id, seq, associateddata, ciphertext):
+        """Return (adc, meta) of a WINDOW frame; raises ValueError when it does not authenticate."""
+        key = AsconKey(kyber_session.derive_message_key(shared_secret, seq))
+        plaintext = ascon_decrypt(key, kyber_session.message_nonce(session_id, seq), associateddata, ciphertext)
+        if plaintext is None:
+            raise ValueError("Window failed authentication")
+        payload = ecg_compression.decompress(associateddata[WINDOW_SIZE:], plaintext)
+        return ecg_codec.decode(payload)
+
+    async def handle(self, request):
+        """aiohttp handler for GET /stream-ecg (WebSocket)."""
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        loop = asyncio.get_running_loop()
+        sessions = {}
+        async for message in ws:
+            if message.type != aiohttp.WSMsgType.BINARY:
+                continue
+            frame_type = fields = None
+            try:
+                frame_type, fields = unpack_frame(message.data)
+                if frame_type == OPEN:
+                    athlete_id, session_id, kyber_ciphertext = fields
+                    shared_secret = await loop.run_in_executor(None, self.open, kyber_ciphertext, session_id)
+                    # seq of the last accepted window: windows must arrive in order and only once
+                    sessions[session_id] = [shared_secret, -1]
+                    await ws.send_json({"type": "open", "session_id": session_id.hex(), "status": "ok"})
+                    continue
+                athlete_id, session_id, seq, first, associateddata, ciphertext = fields
+                if session_id not in sessions:
+                    raise ValueError("Unknown stream session")
+                session = sessions[session_id]
+                if seq <= session[1]:
+                    raise ValueError(f"Replayed or reordered window {seq}")
+                if len(ciphertext) < ASCON_TAG_BYTES:
+                    raise ValueError("Stream window shorter than its Ascon tag")
+                start = time.perf_counter()
+                adc, meta = await loop.run_in_executor(None, self.decrypt, session[0], session_id, seq,
+                                                       associateddata, ciphertext)
+                session[1] = seq
+                self.windows += 1
+                if self.on_window is not None:
+                    self.on_window(athlete_id, first, adc, meta)
+                await ws.send_json({"type": "window", "seq": seq, "session_id": session_id.hex(), "first": first,
+                                    "samples": meta["n_samples"], "status": "ok",
+                                    "decrypt_ms": round((time.perf_counter() - start) * 1000, 3)})
+            except FRAME_ERRORS as e:
+                self.errors += 1
+                seq, session_id = (fields[2], fields[1].hex()) if frame_type == WINDOW else (None, None)
+                # session_id lets the client match the ack to its pending window
+                await ws.send_json({"type": "error", "seq": seq, "session_id": session_id, "status": "error",
+                                    "error": str(e)})
+        return ws
+
+
+def make_app(public_key=None, secret_key=None, on_window=None):
+    """The stand-in receiver: GET /kyber-public-key and GET /stream-ecg (WebSocket)."""
+    if public_key is None:
+        set_mode("512")
+        public_key, secret_key = keygen()
+    receiver = StreamReceiver(secret_key, on_window)
+
+    async def kyber_public_key(request):
+        return web.Response(body=public_key, content_type="application/octet-stream")
+
+    app = web.Application()
+    app["stream_receiver"] = receiver
+    app.router.add_get("/kyber-public-key", kyber_public_key)
+    app.router.add_get("/stream-ecg", receiver.handle)
+    return app
+
+
+async def start_server(app, host="127.0.0.1", port=0):
+    """Run app in the current event loop; returns (runner, base URL)."""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}"
+
+
+# === Sending side ===
+
+def latency_summary(latencies):
+    """Count, mean, p50, p95, p99 and max of latencies (seconds) in milliseconds."""
+    if not latencies:
+        return {"count": 0}
+    ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"count": len(ms), "mean_ms": round(float(ms.mean()), 3), "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3), "p99_ms": round(float(p99), 3), "max_ms": round(float(ms.max()), 3)}
+
+
+async def stream(windows, server_url, athlete_id=0, realtime=True, codec=STREAM_COMPRESSION,
+                 max_messages=kyber_session.DEFAULT_MAX_MESSAGES):
+    """
+    Encrypt and push every window over one WebSocket to server_url/stream-ecg and return a report.
+    realtime=True paces the windows at their sample rate (a window is sent once its last sample would
+    have been captured); otherwise windows are sent as fast as they are encrypted.
+    """
+    loop = asyncio.get_running_loop()
+    pending = {}
+    latencies, encrypt_times, errors = [], [], []
+    sent_bytes = 0
+
+    async def read_acks(ws):
+        async for message in ws:
+            if message.type != aiohttp.WSMsgType.TEXT:
+                continue
+            ack = json.loads(message.data)
+            if ack["type"] == "open":
+                continue
+            captured = pending.pop((ack.get("session_id"), ack["seq"]), None)
+            if ack["status"] != "ok":
+                errors.append(ack)
+                log.warning("window rejected", extra={"seq": ack["seq"], "error": ack.get("error")})
+            elif captured is not None:
+                latencies.append(time.perf_counter() - captured)
+            if not pending and done.is_set():
+                return
+
+    done = asyncio.Event()
+    async with aiohttp.ClientSession() as http:
+        async with http.get(f"{server_url}/kyber-public-key") as resp:
+            resp.raise_for_status()
+            server_pk = await resp.read()
+        ws_url = server_url.replace("http://", "ws://", 1).replace("https://", "wss://", 1)
+        async with http.ws_connect(f"{ws_url}/stream-ecg", max_msg_size=0) as ws:
+            reader = asyncio.create_task(read_acks(ws))
+            session = None
+            started = time.perf_counter()
+            for window in windows:
+                captured = started + window.end / window.fs
+                if realtime:
+                    await asyncio.sleep(max(0.0, captured - time.perf_counter()))
+                else:
+                    captured = time.perf_counter()
+                if session is None or session.expired():
+                    session = await loop.run_in_executor(None, kyber_session.KyberSession, server_pk, max_messages)
+                    await ws.send_bytes(pack_open(athlete_id, session))
+                seq, key, nonce = session.next_message()
+                start = time.perf_counter()
+                frame = await loop.run_in_executor(None, encrypt_window, athlete_id, session.session_id, seq, key,
+                                                   nonce, window, codec)
+                encrypt_times.append(time.perf_counter() - start)
+                pending[(session.session_id.hex(), seq)] = captured
+                await ws.send_bytes(frame)
+                sent_bytes += len(frame)
+                metrics.count_bytes("wire", len(frame))
+            done.set()
+            try:
+                if pending:
+                    await asyncio.wait_for(reader, ACK_TIMEOUT)
+            except asyncio.TimeoutError:
+                log.warning("acknowledgements missing", extra={"windows": len(pending)})
+            reader.cancel()
+            elapsed = time.perf_counter() - started
+
+    windows_sent = len(encrypt_times)
+    return {
+        "windows": windows_sent,
+        "acknowledged": len(latencies),
+        "errors": len(errors),
+        "missing": len(pending),
+        "seconds": round(elapsed, 3),
+        "windows_per_sec": round(windows_sent / elapsed, 3) if elapsed else None,
+        "wire_bytes": sent_bytes,
+        "latency": latency_summary(latencies),
+        "encrypt": latency_summary(encrypt_times),
+    }
+
+
+# === CLI ===
+
+def _windows(args):
+    if args.source == "csv":
+        windows = csv_windows(args.path or "ecg_output.csv", args.window)
+    elif args.source == "wfdb":
+        windows = wfdb_windows(args.path, args.window, loop=args.duration is not None)
+    else:
+        windows = synthetic_windows(args.window, duration=args.duration or 10.0)
+    if args.duration is None:
+        return windows
+    # takewhile, not a filter: a looping wfdb source never ends
+    return itertools.takewhile(lambda window: window.first < args.duration * window.fs, windows)
+
+
+async def _send(args):
+    runner = None
+    server_url = args.server
+    if server_url is None:
+        runner, server_url = await start_server(make_app())
+    try:
+        return await stream(_windows(args), server_url, args.athlete_id, realtime=not args.fast)
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream encrypted ECG windows over a WebSocket")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run the stand-in stream receiver")
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=8765)
+    send = commands.add_parser("send", help="stream windows and report the per-window latency")
+    send.add_argument("--source", choices=("synthetic", "csv", "wfdb"), default="synthetic")
+    send.add_argument("--path", help="CSV file (default ecg_output.csv) or WFDB record path")
+    send.add_argument("--window", type=float, default=WINDOW_SECONDS, help="window length in seconds")
+    send.add_argument("--duration", type=float, help="seconds to stream (WFDB records loop to fill it)")
+    send.add_argument("--athlete-id", type=int, default=0)
+    send.add_argument("--server", default=os.getenv("SERVER_URL"), help="receiver base URL (default: in-process)")
+    send.add_argument("--fast", action="store_true", help="do not pace windows at the sample rate")
+    args = parser.parse_args()
+    if args.command == "send" and args.source == "wfdb" and not args.path:
+        parser.error("--source wfdb needs --path (a WFDB record path without extension)")
+
+    if args.command == "serve":
+        web.run_app(make_app(), host=args.host, port=args.port)
+    else:
+        print(json.dumps(asyncio.run(_send(args)), indent=2))
@@ -2,6 +2,7 @@ import os
 from flask import Flask
 from flask_restx import Api, Resource, fields
 import requests
+import transport
 from hl7apy.core import Message
 from datetime import datetime
 
@@ -75,7 +76,10 @@ class HL7Sender(Resource):
 
         # Send to receiver
         headers = {"Content-Type": "text/plain"}
-        response = requests.post(RECEIVER_URL, data=hl7_msg, headers=headers)
+        try:
+            response = transport.get_transport().post(RECEIVER_URL, data=hl7_msg, headers=headers)
+        except requests.exceptions.RequestException as e:
+            return {"status": "Send failed", "hl7": hl7_msg, "receiver_response": str(e)}, 502
 
         return {
                    "status": "Message sent successfully",
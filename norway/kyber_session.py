@@ -0,0 +1,132 @@
+"""
+Kyber session reuse for uploads.
+
+Instead of fetching the server public key and running a fresh encapsulation for every upload,
+the client keeps
+  - a cached copy of the server public key (revalidated with ETag/If-None-Match after a TTL),
+  - one Kyber encapsulation per session,
+  - per-message Ascon keys derived from the shared secret and a message counter with Ascon-CXOF128,
+  - per-message nonces built from the session id and the counter (never repeated within a session).
+
+The session id is derived from the Kyber ciphertext, so the server can recompute it, and is sent with
+every message together with the counter ("seq") so the server can find the right shared secret.
+"""
+
+import os
+import threading
+import time
+
+from smaj_kyber import encapsulate
+
+import metrics
+import transport
+from pyascon.ascon import AsconKey, ascon_hash
+
+SESSION_ID_CUSTOMIZATION = b"ecg-upload-session-id"
+MESSAGE_KEY_CUSTOMIZATION = b"ecg-upload-message-key"
+CIPHERTEXT_BYTES = 768  # Kyber512
+DEFAULT_KEY_TTL = float(os.getenv("KYBER_KEY_TTL", "300"))
+DEFAULT_MAX_MESSAGES = int(os.getenv("KYBER_SESSION_MAX_MESSAGES", "10000"))
+DEFAULT_MAX_AGE = float(os.getenv("KYBER_SESSION_MAX_AGE", "3600"))
+
+log = metrics.get_logger("kyber")
+
+
+# === Derivations (shared with the receiving side) ===
+
+def derive_session_id(kyber_ciphertext):
+    return ascon_hash(kyber_ciphertext, "Ascon-CXOF128", 16, SESSION_ID_CUSTOMIZATION)
+
+
+def derive_message_key(shared_secret, seq):
+    return ascon_hash(shared_secret + seq.to_bytes(8, "big"), "Ascon-CXOF128", 16, MESSAGE_KEY_CUSTOMIZATION)
+
+
+def message_nonce(session_id, seq):
+    return session_id[:8] + seq.to_bytes(8, "big")
+
+
+# === Public key cache ===
+
+class PublicKeyCache:
+    """Server Kyber public key, fetched once and revalidated with If-None-Match once the TTL expires."""
+
+    def __init__(self, url, ttl=DEFAULT_KEY_TTL, http=None):
+        self.url = url
+        self.ttl = ttl
+        self.http = http or transport.get_transport()
+        self.key = None
+        self.etag = None
+        self.fetched_at = 0.0
+        self.lock = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            if self.key is not None and time.monotonic() - self.fetched_at < self.ttl:
+                return self.key
+            headers = {"If-None-Match": self.etag} if self.key is not None and self.etag else {}
+            resp = self.http.get(self.url, headers=headers)
+            if resp.status_code == 304 and self.key is not None:
+                log.info("kyber public key unchanged (304)")
+            else:
+                resp.raise_for_status()
+                self.key = resp.content
+                self.etag = resp.headers.get("ETag")
+                log.info("received kyber public key from server")
+            self.fetched_at = time.monotonic()
+            return self.key
+
+    def invalidate(self):
+        with self.lock:
+            self.fetched_at = 0.0
+
+
+# === Sessions ===
+
+class KyberSession:
+    """One Kyber encapsulation against a server public key, and the messages protected under it."""
+
+    def __init__(self, server_pk, max_messages=DEFAULT_MAX_MESSAGES, max_age=DEFAULT_MAX_AGE):
+        self.server_pk = server_pk
+        self.kyber_ciphertext, self.shared_secret = encapsulate(server_pk)
+        self.session_id = derive_session_id(self.kyber_ciphertext)
+        self.max_messages = max_messages
+        self.max_age = max_age
+        self.created_at = time.monotonic()
+        self.seq = 0
+        self.lock = threading.Lock()
+
+    def expired(self):
+        return self.seq >= self.max_messages or time.monotonic() - self.created_at >= self.max_age
+
+    def next_message(self):
+        """Return (seq, key, nonce) for the next message: a fresh counter, its AsconKey and its nonce."""
+        with self.lock:
+            seq = self.seq
+            self.seq += 1
+        return seq, AsconKey(derive_message_key(self.shared_secret, seq)), message_nonce(self.session_id, seq)
+
+
+class SessionManager:
+    """Hands out the current session, starting a new one when it expires or the server key changes."""
+
+    def __init__(self, key_cache, max_messages=DEFAULT_MAX_MESSAGES, max_age=DEFAULT_MAX_AGE):
+        self.key_cache = key_cache
+        self.max_messages = max_messages
+        self.max_age = max_age
+        self.session = None
+        self.lock = threading.Lock()
+
+    def current(self):
+        server_pk = self.key_cache.get()
+        with self.lock:
+            if self.session is None or self.session.expired() or self.session.server_pk != server_pk:
+                self.session = KyberSession(server_pk, self.max_messages, self.max_age)
+                log.info("new kyber session", extra={"session_id": self.session.session_id.hex()})
+            return self.session
+
+    def reset(self):
+        """Drop the current session and revalidate the key, e.g. after the server rejected the session."""
+        with self.lock:
+            self.session = None
+        self.key_cache.invalidate()
@@ -0,0 +1,282 @@
+"""
+Load generator for the secure upload protocol: how many ECG uploads per second can a receiver sustain?
+
+Simulated devices replay what upload_ecg does for every upload:
+    key fetch (GET /kyber-public-key, revalidated with If-None-Match) -> Kyber encapsulation (a new
+    session every --messages-per-session uploads; 1 = every upload) -> Ascon encryption with the
+    per-message key and nonce -> POST /secure-ecg (binary or JSON transport)
+using asyncio for the HTTP side and a process pool for encryption (pure-Python Ascon is CPU bound).
+
+Load models:
+    closed loop  --concurrency N devices, each sending its next upload as soon as the last one finished
+    open loop    --rate R uploads per second arriving regardless of completions (Poisson or uniform);
+                 latency is measured from the scheduled arrival, so a backed-up server shows up as
+                 queueing delay instead of a lower offered rate
+
+Reports p50/p95/p99 latency (overall and per phase), throughput and error rates; --csv writes one row
+per upload and --json the configuration and summary, for capacity planning.
+
+usage: python loadgen.py [--server URL] [--mode closed|open] [--concurrency 8] [--rate 10] [--duration 30]
+                         [--requests N] [--record PATH | --seconds 10] [--format ecg-int16-v1|json]
+                         [--transport binary|json] [--compression zlib] [--encrypt-workers N]
+                         [--csv results.csv] [--json results.json]
+       without --server (or SERVER_URL) a receiver (receiver.py) is started in-process.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import aiohttp
+
+import ecg_codec
+import ecg_compression
+import ecg_stream
+import kyber_session
+import receiver
+import record_store
+import upload_pipeline
+from pyascon.ascon import ascon_encrypt
+
+PHASES = ("key_fetch", "encapsulate", "encrypt", "post")
+CSV_FIELDS = ["device", "scheduled", "start", "latency_s", *[f"{phase}_s" for phase in PHASES], "status",
+              "http_status", "wire_bytes", "error"]
+
+
+# === Payload ===
+
+def make_payload(record_path=None, seconds=10.0, payload_format=ecg_codec.FORMAT_NAME, compression="zlib",
+                 delta_order=1):
+    """Return (compression header, compressed plaintext, stats) of one upload, prepared once and reused."""
+    if record_path:
+        payload = record_store.get_store().get(record_path).payload()
+    else:
+        window = next(ecg_stream.synthetic_windows(seconds, duration=seconds))
+        payload = window.payload()
+    if payload_format == "json":
+        payload = ecg_codec.to_dataframe(payload).to_json(orient='records').encode()
+    return ecg_compression.compress(payload, compression, delta_order)
+
+
+def _encrypt(key, nonce, associateddata, plaintext):
+    return ascon_encrypt(key, nonce, associateddata, plaintext)
+
+
+# === Devices ===
+
+class Device:
+    """One simulated uploader: its cached server key (and ETag) and its current Kyber session."""
+
+    def __init__(self, device_id, messages_per_session):
+        self.id = device_id
+        self.messages_per_session = messages_per_session
+        self.server_pk = None
+        self.etag = None
+        self.session = None
+
+    async def upload(self, http, config, payload, executor, scheduled=None):
+        """Run one upload; returns its result row (phase timings in seconds, status, error)."""
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        row = {"device": self.id, "scheduled": scheduled if scheduled is not None else start, "start": start,
+               "status": "error", "http_status": None, "wire_bytes": 0, "error": ""}
+        phase_start = start
+        phase = PHASES[0]
+        try:
+            headers = {"If-None-Match": self.etag} if self.etag else {}
+            async with http.get(f"{config.server}/kyber-public-key", headers=headers) as resp:
+                if resp.status != 304:
+                    resp.raise_for_status()
+                    self.server_pk = await resp.read()
+                    self.etag = resp.headers.get("ETag")
+            phase_start = self._lap(row, phase, phase_start)
+
+            phase = "encapsulate"
+            if self.session is None or self.session.expired() or self.session.server_pk != self.server_pk:
+                # Encapsulation is native code: run it on a thread, not on the event loop
+                self.session = await loop.run_in_executor(None, kyber_session.KyberSession, self.server_pk,
+                                                          self.messages_per_session)
+            # Open-loop uploads of one device overlap: keep this upload's session even if a newer one starts
+            session = self.session
+            seq, key, nonce = session.next_message()
+            phase_start = self._lap(row, phase, phase_start)
+
+            phase = "encrypt"
+            compression_header, plaintext, _ = payload
+            message = (session, seq, key, nonce)
+            associateddata = upload_pipeline.associated_data(self.id, compression_header, message, config.format)
+            ciphertext = await loop.run_in_executor(executor, _encrypt, bytes(key), nonce, associateddata, plaintext)
+            request_args = upload_pipeline.build_request(self.id, compression_header, None, message, ciphertext,
+                                                         config.transport, config.format)
+            phase_start = self._lap(row, phase, phase_start)
+
+            phase = "post"
+            if "json" in request_args:
+                body = json.dumps(request_args["json"]).encode()
+            else:
+                body = request_args["data"]
+            row["wire_bytes"] = len(body)
+            async with http.post(f"{config.server}/secure-ecg", data=body, headers=request_args["headers"]) as resp:
+                await resp.read()
+                row["http_status"] = resp.status
+                if resp.status in (401, 409) and self.session is session:
+                    self.session = None
+            self._lap(row, phase, phase_start)
+            row["status"] = "success" if 200 <= row["http_status"] < 300 else "error"
+            if row["status"] == "error":
+                row["error"] = f"HTTP {row['http_status']}"
+        except Exception as e:
+            self._lap(row, phase, phase_start)
+            row["error"] = f"{phase}: {type(e).__name__}: {e}"
+        row["latency_s"] = time.perf_counter() - row["scheduled"]
+        return row
+
+    @staticmethod
+    def _lap(row, phase, phase_start):
+        now = time.perf_counter()
+        row[f"{phase}_s"] = now - phase_start
+        return now
+
+
+# === Load models ===
+
+async def closed_loop(config, payload, executor):
+    """config.concurrency devices uploading back to back until the duration or request budget is used up."""
+    deadline = time.perf_counter() + config.duration
+    budget = [config.requests]
+    rows = []
+
+    async def run(device, http):
+        while time.perf_counter() < deadline and (budget[0] is None or budget[0] > 0):
+            if budget[0] is not None:
+                budget[0] -= 1
+            rows.append(await device.upload(http, config, payload, executor))
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=config.concurrency)) as http:
+        devices = [Device(i, config.messages_per_session) for i in range(config.concurrency)]
+        await asyncio.gather(*(run(device, http) for device in devices))
+    return rows
+
+
+async def open_loop(config, payload, executor):
+    """Uploads arriving at config.rate per second over config.duration, spread over config.concurrency devices."""
+    rng = random.Random(config.seed)
+    rows, tasks = [], set()
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as http:
+        devices = [Device(i, config.messages_per_session) for i in range(config.concurrency)]
+        start = time.perf_counter()
+        scheduled, count = start, 0
+        while scheduled < start + config.duration and (config.requests is None or count < config.requests):
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            if len(tasks) >= config.max_outstanding:
+                rows.append({"device": None, "scheduled": scheduled, "start": scheduled, "latency_s": 0.0,
+                             "status": "dropped", "http_status": None, "wire_bytes": 0,
+                             "error": f"more than {config.max_outstanding} uploads outstanding"})
+            else:
+                task = asyncio.ensure_future(devices[count % len(devices)].upload(http, config, payload, executor,
+                                                                                  scheduled))
+                tasks.add(task)
+                task.add_done_callback(lambda t: (tasks.discard(t), rows.append(t.result())))
+            count += 1
+            scheduled += rng.expovariate(config.rate) if config.arrivals == "poisson" else 1.0 / config.rate
+        if tasks:
+            await asyncio.gather(*tasks)
+    return rows
+
+
+# === Report ===
+
+def summarize(rows, elapsed, payload):
+    succeeded = [row for row in rows if row["status"] == "success"]
+    statuses = {}
+    for row in rows:
+        key = row["status"] if row["http_status"] is None else f"{row['status']} {row['http_status']}"
+        statuses[key] = statuses.get(key, 0) + 1
+    wire_bytes = sum(row["wire_bytes"] for row in succeeded)
+    return {
+        "requests": len(rows),
+        "succeeded": len(succeeded),
+        "errors": len(rows) - len(succeeded),
+        "error_rate": round((len(rows) - len(succeeded)) / len(rows), 4) if rows else None,
+        "statuses": statuses,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(succeeded) / elapsed, 3) if elapsed else None,
+        "wire_mb_per_sec": round(wire_bytes / 1e6 / elapsed, 3) if elapsed else None,
+        "payload": {"raw_bytes": payload[2]["raw_bytes"], "compressed_bytes": payload[2]["compressed_bytes"]},
+        "latency": ecg_stream.latency_summary([row["latency_s"] for row in succeeded]),
+        "phases": {phase: ecg_stream.latency_summary([row[f"{phase}_s"] for row in succeeded]) for phase in PHASES},
+    }
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        origin = min((row["scheduled"] for row in rows), default=0.0)
+        for row in rows:
+            writer.writerow({**row, "scheduled": round(row["scheduled"] - origin, 6),
+                             "start": round(row["start"] - origin, 6)})
+
+
+async def run(config):
+    """Run the configured load and return (summary, rows)."""
+    payload = make_payload(config.record, config.seconds, config.format, config.compression)
+    server = None
+    if not config.server:
+        server = receiver.ReceiverServer(receiver.Receiver(workers=config.receiver_workers)).start()
+        config.server = server.url
+    executor = ProcessPoolExecutor(config.encrypt_workers) if config.encrypt_workers > 0 else None
+    try:
+        start = time.perf_counter()
+        rows = await (open_loop if config.mode == "open" else closed_loop)(config, payload, executor)
+        elapsed = time.perf_counter() - start
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if server is not None:
+            server.stop()
+    summary = summarize(rows, elapsed, payload)
+    summary["config"] = {name: value for name, value in vars(config).items() if name not in ("csv", "json")}
+    return summary, rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the encrypted ECG upload protocol")
+    parser.add_argument("--server", default=os.getenv("SERVER_URL"), help="receiver base URL (default: in-process)")
+    parser.add_argument("--mode", choices=("closed", "open"), default="closed")
+    parser.add_argument("--concurrency", type=int, default=8, help="simulated devices")
+    parser.add_argument("--rate", type=float, default=10.0, help="open loop: uploads per second")
+    parser.add_argument("--arrivals", choices=("poisson", "uniform"), default="poisson")
+    parser.add_argument("--max-outstanding", type=int, default=1000, help="open loop: drop arrivals beyond this")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--requests", type=int, help="stop after this many uploads")
+    parser.add_argument("--record", help="WFDB record to upload (default: synthetic ECG)")
+    parser.add_argument("--seconds", type=float, default=10.0, help="synthetic ECG length (payload size)")
+    parser.add_argument("--format", choices=(ecg_codec.FORMAT_NAME, "json"), default=ecg_codec.FORMAT_NAME)
+    parser.add_argument("--transport", choices=("binary", "json"), default="binary")
+    parser.add_argument("--compression", choices=sorted(ecg_compression.CODECS), default="zlib")
+    parser.add_argument("--messages-per-session", type=int, default=kyber_session.DEFAULT_MAX_MESSAGES,
+                        help="uploads per Kyber encapsulation (1 = encapsulate every upload)")
+    parser.add_argument("--encrypt-workers", type=int, default=os.cpu_count() or 1,
+                        help="encryption processes (0 = threads of this process)")
+    parser.add_argument("--receiver-workers", type=int, default=0, help="in-process receiver decryption processes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", help="write one row per upload to this CSV file")
+    parser.add_argument("--json", help="write the configuration and summary to this JSON file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    summary, rows = asyncio.run(run(args))
+    if args.csv:
+        write_csv(args.csv, rows)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    print(json.dumps(summary, indent=2))
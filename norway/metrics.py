@@ -0,0 +1,344 @@
+"""
+Instrumentation for the client app: Prometheus-style metrics and structured logs.
+
+Metrics (all in-process, exposed in the Prometheus text format by render(), see GET /metrics):
+  - histograms of per-stage durations (key fetch, record load, serialization, encryption, POST, ...),
+    recorded with timer(), which works both as a context manager and as a decorator;
+  - byte counters (plaintext, ciphertext and wire sizes of uploads);
+  - in-flight gauges (uploads, HTTP requests), also maintained by timer().
+
+Logs are one JSON object per line carrying the current request id, set per Flask request (from the
+X-Request-ID header or generated) and per background job, so the lines of one upload can be
+correlated across the web and worker threads.
+
+Configuration (environment):
+    LOG_LEVEL   logging level of the app loggers (default INFO)
+"""
+
+import bisect
+import contextvars
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Seconds; spans a cached key lookup (~us) up to a slow multi-megabyte upload
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+# === Metric types ===
+
+def _label_key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f"expected labels {labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = list(zip(labelnames, key)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def samples(self):
+        """Yield (suffix, labels string, value) for the text format."""
+        with self.lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            yield "", _format_labels(self.labelnames, key), value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{self.name}{suffix}{labels} {_format_value(value)}" for suffix, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("counters only go up")
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(_label_key(self.labelnames, labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = value
+
+    def get(self, **labels):
+        return self.values.get(_label_key(self.labelnames, labels), 0)
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the enclosed block as in flight."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                # Per-bucket (not cumulative) counts, then sum and count
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    def summary(self, **labels):
+        """(count, sum) observed so far for these labels."""
+        state = self.values.get(_label_key(self.labelnames, labels))
+        return (state[2], state[1]) if state else (0, 0.0)
+
+    def samples(self):
+        with self.lock:
+            items = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self.values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield "_bucket", _format_labels(self.labelnames, key, [("le", _format_value(float(bound)))]), \
+                    cumulative
+            yield "_sum", _format_labels(self.labelnames, key), total
+            yield "_count", _format_labels(self.labelnames, key), count
+
+
+class Registry:
+    """Named metrics, rendered together in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"metric {metric.name} already registered")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "ecg_stage_seconds", "Duration of each upload/viewer stage in seconds.", ("stage",)))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    "ecg_stage_errors_total", "Stages that ended with an exception.", ("stage",)))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    "ecg_in_flight", "Stages currently running.", ("stage",)))
+UPLOAD_QUEUE_PENDING = REGISTRY.register(Gauge(
+    "ecg_upload_queue_pending", "Upload jobs waiting for a worker."))
+UPLOAD_BYTES = REGISTRY.register(Counter(
+    "ecg_upload_bytes_total", "Upload sizes: plaintext (before compression), ciphertext and wire (HTTP body).",
+    ("kind",)))
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "ecg_http_requests_total", "HTTP requests served by the app.", ("method", "endpoint", "status")))
+HTTP_SECONDS = REGISTRY.register(Histogram(
+    "ecg_http_request_seconds", "HTTP request handling time in seconds.", ("method", "endpoint")))
+
+
+def render():
+    return REGISTRY.render()
+
+
+# === Timers ===
+
+class timer:
+    """
+    Time a stage into STAGE_SECONDS, counting it as in flight while it runs:
+
+        with metrics.timer("encrypt"):
+            ...
+
+        @metrics.timer("load")
+        def load_record(...):
+            ...
+
+    .seconds holds the duration of the last timed block.
+    """
+
+    def __init__(self, stage, histogram=STAGE_SECONDS, gauge=IN_FLIGHT):
+        self.stage = stage
+        self.histogram = histogram
+        self.gauge = gauge
+        self.seconds = None
+        self._starts = threading.local()
+
+    def __enter__(self):
+        self.gauge.inc(stage=self.stage)
+        self._starts.__dict__.setdefault("stack", []).append(time.perf_counter())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self._starts.stack.pop()
+        self.gauge.dec(stage=self.stage)
+        self.histogram.observe(self.seconds, stage=self.stage)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(stage=self.stage)
+        return False
+
+    def __call__(self, function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with self:
+                return function(*args, **kwargs)
+        return wrapper
+
+
+def count_bytes(kind, amount):
+    UPLOAD_BYTES.inc(amount, kind=kind)
+
+
+def counted(kind, chunks):
+    """Pass an iterable of byte chunks through, counting them as they are consumed (streamed bodies)."""
+    for chunk in chunks:
+        UPLOAD_BYTES.inc(len(chunk), kind=kind)
+        yield chunk
+
+
+def timed(stage, chunks):
+    """
+    Pass an iterable through, timing only the production of its items (e.g. encrypting a streamed body,
+    not sending it) into STAGE_SECONDS once it is exhausted.
+    """
+    iterator = iter(chunks)
+    seconds = 0.0
+    while True:
+        start = time.perf_counter()
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            break
+        except Exception:
+            STAGE_ERRORS.inc(stage=stage)
+            raise
+        finally:
+            seconds += time.perf_counter() - start
+        yield chunk
+    STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+# === Request ids and structured logs ===
+
+_REQUEST_ID = contextvars.ContextVar("request_id", default=None)
+
+
+def new_request_id():
+    return uuid.uuid4().hex[:16]
+
+
+def current_request_id():
+    return _REQUEST_ID.get()
+
+
+@contextmanager
+def request_id(value=None):
+    """Set the request id (a new one if value is None) for the enclosed block, in this thread."""
+    token = _REQUEST_ID.set(value or new_request_id())
+    try:
+        yield _REQUEST_ID.get()
+    finally:
+        _REQUEST_ID.reset(token)
+
+
+def set_request_id(value=None):
+    """Set the request id until the returned token is passed to reset_request_id() (Flask hooks)."""
+    return _REQUEST_ID.set(value or new_request_id())
+
+
+def reset_request_id(token):
+    _REQUEST_ID.reset(token)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, request id, message and any extra= fields."""
+
+    RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": _REQUEST_ID.get(),
+            "message": record.getMessage(),
+        }
+        entry.update((name, value) for name, value in vars(record).items() if name not in self.RESERVED)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+_logging_lock = threading.Lock()
+_root_logger = logging.getLogger("ecg")
+
+
+def get_logger(name):
+    """A logger under "ecg" writing JSON lines to stderr (handler installed once)."""
+    with _logging_lock:
+        if not _root_logger.handlers:
+            handler = logging.StreamHandler(sys.stderr)
+            handler.setFormatter(JsonFormatter())
+            _root_logger.addHandler(handler)
+            _root_logger.setLevel(LOG_LEVEL)
+            _root_logger.propagate = False
+    return _root_logger.getChild(name)
@@ -1,20 +1,14 @@
-import wfdb
 import numpy as np
-import os
 import plotly.graph_objects as go
+import dataset_store
+import ecg_grid
 
 # Path to your ECG data
 directory = "/Users/mac/Desktop/secure by design/norway/norwegian-endurance-athlete-ecg-database-1.0.0/"
 
-# Load ECGs
-ECGs = []
-for filename in sorted(os.listdir(directory)):
-    if filename.endswith(".dat"):
-        record_name = filename.split(".")[0]
-        signals, fields = wfdb.rdsamp(os.path.join(directory, record_name))
-        ECGs.append(signals)
-
-ECGs = np.array(ECGs)
+# Load ECGs (from the .npy store next to the WFDB files, rebuilt only when records change)
+store = dataset_store.open_store(directory)
+ECGs = store.stack()
 print("Loaded ECGs shape:", ECGs.shape)
 
 # Get first ECG sample
@@ -44,42 +38,20 @@ fig.add_trace(go.Scatter(
     showlegend=True
 ))
 
-# === Add ECG-style grid ===
-shapes = []
-grid_color = 'rgba(255, 0, 0, 0.4)'  # softer red
-
-# Vertical lines every 0.2 seconds
-for t in np.arange(0, duration_sec + 0.2, 0.2):
-    shapes.append(dict(
-        type='line',
-        x0=t, x1=t,
-        y0=min(signal) - 0.2,
-        y1=max(signal) + 0.2,
-        line=dict(color=grid_color, width=0.5)
-    ))
-
-# Horizontal lines every 0.5 mV
-for y in np.arange(np.floor(min(signal)) - 0.5, np.ceil(max(signal)) + 0.5, 0.5):
-    shapes.append(dict(
-        type='line',
-        x0=0,
-        x1=duration_sec,
-        y0=y,
-        y1=y,
-        line=dict(color=grid_color, width=0.5)
-    ))
-
 # === Layout Settings ===
 fig.update_layout(
     title=f"ECG Viewer - Lead {lead_label}",
-    xaxis=dict(title="Time (seconds)", showgrid=False),
-    yaxis=dict(title="Voltage (mV)", showgrid=False),
-    shapes=shapes,
+    xaxis=dict(title="Time (seconds)"),
+    yaxis=dict(title="Voltage (mV)"),
     template="simple_white",
     height=400,
     margin=dict(l=60, r=30, t=60, b=40)
 )
 
+# === ECG-style grid (every 0.2 sec and 0.5 mV, softer red) ===
+ecg_grid.apply_ecg_grid(fig, (0, duration_sec), (np.floor(min(signal)) - 0.5, np.ceil(max(signal)) + 0.5),
+                        color='rgba(255, 0, 0, 0.4)', width=0.5)
+
 # === Show & Export ===
 fig.show()
 # fig.write_html(f"ecg_lead_{lead_label}.html")
@@ -6,9 +6,13 @@ NIST SP 800-232
 https://ascon.iaik.tugraz.at/
 """
 
+import struct
+
 debug = False
 debugpermutation = False
 
+BULK_BLOCKS = 4096 # blocks per struct.unpack_from/pack_into call in the bulk data path
+
 # === Ascon hash/xof ===
 
 def ascon_hash(message, variant="Ascon-Hash256", hashlength=32, customization=b""): 
@@ -76,7 +80,7 @@ def ascon_hash(message, variant="Ascon-Hash256", hashlength=32, customization=b"
 def ascon_mac(key, message, variant="Ascon-Mac", taglength=16): 
     """
     Ascon message authentication code (MAC) and pseudorandom function (PRF).
-    key: a bytes object of size 16
+    key: a bytes object of size 16 or an AsconKey (which caches the initialization of "Ascon-Mac" and "Ascon-Prf")
     message: a bytes object of arbitrary length (<= 16 for "Ascon-PrfShort")
     variant: "Ascon-Mac" (128-bit output, arbitrarily long input), "Ascon-Prf" (arbitrarily long input and output), or "Ascon-PrfShort" (t-bit output for t<=128, m-bit input for m<=128)
     taglength: the requested output bytelength l/8 (must be <=16 for variants "Ascon-Mac" and "Ascon-PrfShort", arbitrary for "Ascon-Prf"; should be >= 16 for 128-bit security)
@@ -89,30 +93,36 @@ def ascon_mac(key, message, variant="Ascon-Mac", taglength=16):
     a = b = 12  # rounds
     msgblocksize = 32 # bytes (input rate for Mac, Prf)
     rate = 16 # bytes (output rate)
+    k0, k1 = key_words(key)
+    permutation = select_permutation()
 
     # TODO update IVs to be consistent with NIST format
 
     if variant == "Ascon-PrfShort":
         # Initialization + Message Processing (Absorbing)
         IV = to_bytes([len(key) * 8, len(message)*8, a + 64, taglength * 8]) + zero_bytes(4)
-        S = bytes_to_state(IV + key + message + zero_bytes(16 - len(message)))
+        S = bytes_to_state(IV + bytes(key) + message + zero_bytes(16 - len(message)))
         if debug: printstate(S, "initial value:")
 
-        ascon_permutation(S, a)
+        permutation(S, a)
         if debug: printstate(S, "process message:")
 
         # Finalization (Squeezing)
-        T = int_to_bytes(S[3] ^ bytes_to_int(key[0:8]), 8) + int_to_bytes(S[4] ^ bytes_to_int(key[8:16]), 8)
+        T = int_to_bytes(S[3] ^ k0, 8) + int_to_bytes(S[4] ^ k1, 8)
         return T[:taglength]
 
     else: # Ascon-Prf, Ascon-Mac
-        # Initialization
-        if variant == "Ascon-Mac": tagspec = int_to_bytes(16*8, 4)
-        if variant == "Ascon-Prf": tagspec = int_to_bytes(0*8, 4)
-        S = bytes_to_state(to_bytes([len(key) * 8, rate * 8, a + 128, a-b]) + tagspec + key + zero_bytes(16))
-        if debug: printstate(S, "initial value:")
-
-        ascon_permutation(S, a)
+        # Initialization (cached per variant for an AsconKey)
+        if isinstance(key, AsconKey) and variant in key.mac_states:
+            S = list(key.mac_states[variant])
+        else:
+            if variant == "Ascon-Mac": tagspec = int_to_bytes(16*8, 4)
+            if variant == "Ascon-Prf": tagspec = int_to_bytes(0*8, 4)
+            S = bytes_to_state(to_bytes([len(key) * 8, rate * 8, a + 128, a-b]) + tagspec + bytes(key) + zero_bytes(16))
+            if debug: printstate(S, "initial value:")
+
+            permutation(S, a)
+            if isinstance(key, AsconKey): key.mac_states[variant] = tuple(S)
         if debug: printstate(S, "initialization:")
 
         # Message Processing (Absorbing)
@@ -121,63 +131,122 @@ def ascon_mac(key, message, variant="Ascon-Mac", taglength=16):
 
         # first s-1 blocks
         for block in range(0, len(m_padded) - msgblocksize, msgblocksize):
-            S[0] ^= bytes_to_int(m_padded[block:block+8])     # msgblocksize=32 bytes
-            S[1] ^= bytes_to_int(m_padded[block+8:block+16])
-            S[2] ^= bytes_to_int(m_padded[block+16:block+24])
-            S[3] ^= bytes_to_int(m_padded[block+24:block+32])
-            ascon_permutation(S, b)
+            M = struct.unpack_from("<4Q", m_padded, block)     # msgblocksize=32 bytes
+            S[0] ^= M[0]
+            S[1] ^= M[1]
+            S[2] ^= M[2]
+            S[3] ^= M[3]
+            permutation(S, b)
         # last block
         block = len(m_padded) - msgblocksize
-        S[0] ^= bytes_to_int(m_padded[block:block+8])     # msgblocksize=32 bytes
-        S[1] ^= bytes_to_int(m_padded[block+8:block+16])
-        S[2] ^= bytes_to_int(m_padded[block+16:block+24])
-        S[3] ^= bytes_to_int(m_padded[block+24:block+32])
+        M = struct.unpack_from("<4Q", m_padded, block)     # msgblocksize=32 bytes
+        S[0] ^= M[0]
+        S[1] ^= M[1]
+        S[2] ^= M[2]
+        S[3] ^= M[3]
         S[4] ^= 1
         if debug: printstate(S, "process message:")
 
         # Finalization (Squeezing)
         T = b""
-        ascon_permutation(S, a)
+        permutation(S, a)
         while len(T) < taglength:
             T += int_to_bytes(S[0], 8)  # rate=16
             T += int_to_bytes(S[1], 8)
-            ascon_permutation(S, b)
+            permutation(S, b)
         if debug: printstate(S, "finalization:")
         return T[:taglength]
 
 
+# === Ascon keys ===
+
+class AsconKey:
+    """
+    A 128-bit Ascon key with precomputed key words, for reuse across many messages.
+    Can be passed as key to ascon_encrypt, ascon_decrypt, AsconEncryptor, AsconDecryptor and ascon_mac.
+    For "Ascon-Mac" and "Ascon-Prf", ascon_mac caches the state after the 12-round initialization,
+    so that further messages under the same key skip it.
+    """
+
+    def __init__(self, key):
+        """
+        key: a bytes object of size 16
+        """
+        assert len(key) == 16
+        self.key = bytes(key)
+        self.words = (bytes_to_int(self.key[0:8]), bytes_to_int(self.key[8:16]))
+        self.mac_states = {}  # variant -> state after initialization
+
+    def __len__(self):
+        return len(self.key)
+
+    def __bytes__(self):
+        return self.key
+
+
+def key_words(key):
+    """
+    Returns the two 64-bit words of a key - internal helper function.
+    key: a bytes object of size 16 or an AsconKey
+    """
+    if isinstance(key, AsconKey):
+        return key.words
+    assert len(key) == 16
+    return (bytes_to_int(key[0:8]), bytes_to_int(key[8:16]))
+
+
 # === Ascon AEAD encryption and decryption ===
 
 def ascon_encrypt(key, nonce, associateddata, plaintext, variant="Ascon-AEAD128"): 
     """
     Ascon encryption.
-    key: a bytes object of size 16 (for Ascon-AEAD128; 128-bit security)
+    key: a bytes object of size 16 (for Ascon-AEAD128; 128-bit security) or an AsconKey
     nonce: a bytes object of size 16 (must not repeat for the same key!)
     associateddata: a bytes object of arbitrary length
     plaintext: a bytes object of arbitrary length
     variant: "Ascon-AEAD128"
     returns a bytes object of length len(plaintext)+16 containing the ciphertext and tag
     """
+    ciphertext = bytearray(len(plaintext) + 16)
+    ascon_encrypt_into(ciphertext, key, nonce, associateddata, plaintext, variant)
+    return bytes(ciphertext)
+
+
+def ascon_encrypt_into(out_buffer, key, nonce, associateddata, plaintext, variant="Ascon-AEAD128"):
+    """
+    Ascon encryption into a caller-provided buffer (e.g. to reuse one buffer across messages).
+    out_buffer: a writable bytes-like object of at least len(plaintext)+16 bytes
+    key: a bytes object of size 16 (for Ascon-AEAD128; 128-bit security) or an AsconKey
+    nonce: a bytes object of size 16 (must not repeat for the same key!)
+    associateddata: a bytes object of arbitrary length
+    plaintext: a bytes-like object of arbitrary length
+    variant: "Ascon-AEAD128"
+    returns the number of bytes written to out_buffer (len(plaintext)+16: the ciphertext followed by the tag)
+    """
     versions = {"Ascon-AEAD128": 1}
     assert variant in versions.keys()
     assert len(key) == 16 and len(nonce) == 16
+    plaintext = memoryview(plaintext).cast("B")
+    out = memoryview(out_buffer).cast("B")
+    assert len(out) >= len(plaintext) + 16
     S = [0, 0, 0, 0, 0]
     k = len(key) * 8   # bits
     a = 12   # rounds
     b = 8    # rounds
     rate = 16   # bytes
+    permutation = select_permutation()
 
-    ascon_initialize(S, k, rate, a, b, versions[variant], key, nonce)
-    ascon_process_associated_data(S, b, rate, associateddata)
-    ciphertext = ascon_process_plaintext(S, b, rate, plaintext)
-    tag = ascon_finalize(S, rate, a, key)
-    return ciphertext + tag
+    ascon_initialize(S, k, rate, a, b, versions[variant], key, nonce, permutation)
+    ascon_process_associated_data(S, b, rate, associateddata, permutation)
+    ascon_process_plaintext(S, b, rate, plaintext, permutation, out[:len(plaintext)])
+    out[len(plaintext):len(plaintext)+16] = ascon_finalize(S, rate, a, key, permutation)
+    return len(plaintext) + 16
 
 
 def ascon_decrypt(key, nonce, associateddata, ciphertext, variant="Ascon-AEAD128"):
     """
     Ascon decryption.
-    key: a bytes object of size 16 (for Ascon-AEAD128; 128-bit security)
+    key: a bytes object of size 16 (for Ascon-AEAD128; 128-bit security) or an AsconKey
     nonce: a bytes object of size 16 (must not repeat for the same key!)
     associateddata: a bytes object of arbitrary length
     ciphertext: a bytes object of arbitrary length (also contains tag)
@@ -193,19 +262,143 @@ def ascon_decrypt(key, nonce, associateddata, ciphertext, variant="Ascon-AEAD128
     b = 8   # rounds
     rate = 16   # bytes
 
-    ascon_initialize(S, k, rate, a, b, versions[variant], key, nonce)
-    ascon_process_associated_data(S, b, rate, associateddata)
-    plaintext = ascon_process_ciphertext(S, b, rate, ciphertext[:-16])
-    tag = ascon_finalize(S, rate, a, key)
+    permutation = select_permutation()
+
+    ascon_initialize(S, k, rate, a, b, versions[variant], key, nonce, permutation)
+    ascon_process_associated_data(S, b, rate, associateddata, permutation)
+    plaintext = ascon_process_ciphertext(S, b, rate, memoryview(ciphertext)[:-16], permutation)
+    tag = ascon_finalize(S, rate, a, key, permutation)
     if tag == ciphertext[-16:]:
-        return plaintext
+        return bytes(plaintext)
     else:
         return None
 
 
+
+# === Ascon AEAD incremental encryption and decryption ===
+
+class AsconEncryptor:
+    """
+    Incremental Ascon encryption with a bounded buffer.
+    Feed the plaintext in chunks of arbitrary size to update(), then call finalize().
+    The concatenated outputs equal ascon_encrypt(key, nonce, associateddata, plaintext, variant).
+    """
+
+    def __init__(self, key, nonce, associateddata=b"", variant="Ascon-AEAD128"):
+        """
+        key: a bytes object of size 16 (for Ascon-AEAD128; 128-bit security) or an AsconKey
+        nonce: a bytes object of size 16 (must not repeat for the same key!)
+        associateddata: a bytes object of arbitrary length
+        variant: "Ascon-AEAD128"
+        """
+        versions = {"Ascon-AEAD128": 1}
+        assert variant in versions.keys()
+        assert len(key) == 16 and len(nonce) == 16
+        self.key = key
+        self.S = [0, 0, 0, 0, 0]
+        self.a = 12   # rounds
+        self.b = 8    # rounds
+        self.rate = 16   # bytes
+        self.permutation = select_permutation()
+        self.buffer = bytearray()  # plaintext of the current, incomplete block
+        self.finalized = False
+
+        ascon_initialize(self.S, len(key) * 8, self.rate, self.a, self.b, versions[variant], key, nonce, self.permutation)
+        ascon_process_associated_data(self.S, self.b, self.rate, associateddata, self.permutation)
+
+    def update(self, chunk):
+        """
+        chunk: a bytes-like object of arbitrary length (the next part of the plaintext)
+        returns the ciphertext of all blocks completed so far (possibly empty)
+        """
+        assert not self.finalized, "cannot update after finalize"
+        self.buffer += chunk
+        fulllen = len(self.buffer) - len(self.buffer) % self.rate
+        ciphertext = bytearray(fulllen)
+        with memoryview(self.buffer) as view:
+            ascon_process_plaintext_blocks(self.S, self.b, self.rate, view[:fulllen], ciphertext, self.permutation)
+        del self.buffer[:fulllen]
+        return bytes(ciphertext)
+
+    def finalize(self):
+        """
+        returns the ciphertext of the last (incomplete) block followed by the 16-byte tag
+        """
+        assert not self.finalized, "cannot finalize twice"
+        self.finalized = True
+        lastlen = len(self.buffer)
+        ciphertext = bytearray(lastlen + 16)
+        ascon_process_plaintext_last(self.S, self.rate, self.buffer, ciphertext)
+        ciphertext[lastlen:] = ascon_finalize(self.S, self.rate, self.a, self.key, self.permutation)
+        return bytes(ciphertext)
+
+
+class AsconDecryptor:
+    """
+    Incremental Ascon decryption with a bounded buffer.
+    Feed the ciphertext (including the trailing tag) in chunks of arbitrary size to update(), then call finalize().
+    The plaintext returned by update() is unverified until finalize() succeeds!
+    """
+
+    def __init__(self, key, nonce, associateddata=b"", variant="Ascon-AEAD128"):
+        """
+        key: a bytes object of size 16 (for Ascon-AEAD128; 128-bit security) or an AsconKey
+        nonce: a bytes object of size 16 (must not repeat for the same key!)
+        associateddata: a bytes object of arbitrary length
+        variant: "Ascon-AEAD128"
+        """
+        versions = {"Ascon-AEAD128": 1}
+        assert variant in versions.keys()
+        assert len(key) == 16 and len(nonce) == 16
+        self.key = key
+        self.S = [0, 0, 0, 0, 0]
+        self.a = 12   # rounds
+        self.b = 8    # rounds
+        self.rate = 16   # bytes
+        self.taglen = 16   # bytes
+        self.permutation = select_permutation()
+        self.buffer = bytearray()  # ciphertext of the current, incomplete block and the (potential) tag
+        self.finalized = False
+
+        ascon_initialize(self.S, len(key) * 8, self.rate, self.a, self.b, versions[variant], key, nonce, self.permutation)
+        ascon_process_associated_data(self.S, self.b, self.rate, associateddata, self.permutation)
+
+    def update(self, chunk):
+        """
+        chunk: a bytes-like object of arbitrary length (the next part of the ciphertext and tag)
+        returns the (unverified) plaintext of all blocks that cannot be part of the tag (possibly empty)
+        """
+        assert not self.finalized, "cannot update after finalize"
+        self.buffer += chunk
+        available = max(0, len(self.buffer) - self.taglen)
+        fulllen = available - available % self.rate
+        plaintext = bytearray(fulllen)
+        with memoryview(self.buffer) as view:
+            ascon_process_ciphertext_blocks(self.S, self.b, self.rate, view[:fulllen], plaintext, self.permutation)
+        del self.buffer[:fulllen]
+        return bytes(plaintext)
+
+    def finalize(self):
+        """
+        returns the plaintext of the last (incomplete) block or None if verification fails
+        """
+        assert not self.finalized, "cannot finalize twice"
+        assert len(self.buffer) >= self.taglen, "ciphertext is shorter than the tag"
+        self.finalized = True
+        lastlen = len(self.buffer) - self.taglen
+        plaintext = bytearray(lastlen)
+        with memoryview(self.buffer) as view:
+            ascon_process_ciphertext_last(self.S, self.rate, view[:lastlen], plaintext)
+        tag = ascon_finalize(self.S, self.rate, self.a, self.key, self.permutation)
+        if tag == self.buffer[lastlen:]:
+            return bytes(plaintext)
+        else:
+            return None
+
+
 # === Ascon AEAD building blocks ===
 
-def ascon_initialize(S, k, rate, a, b, version, key, nonce):
+def ascon_initialize(S, k, rate, a, b, version, key, nonce, permutation=None):
     """
     Ascon initialization phase - internal helper function.
     S: Ascon state, a list of 5 64-bit integers
@@ -214,35 +407,36 @@ def ascon_initialize(S, k, rate, a, b, version, key, nonce):
     a: number of initialization/finalization rounds for permutation
     b: number of intermediate rounds for permutation
     version: 1 (for Ascon-AEAD128)
-    key: a bytes object of size 16 (for Ascon-AEAD128; 128-bit security)
+    key: a bytes object of size 16 (for Ascon-AEAD128; 128-bit security) or an AsconKey
     nonce: a bytes object of size 16
+    permutation: the permutation engine to use (default: the reference ascon_permutation)
     returns nothing, updates S
     """
+    permutation = permutation or ascon_permutation
     taglen = 128
+    k0, k1 = key_words(key)
     iv = to_bytes([version, 0, (b<<4) + a]) + int_to_bytes(taglen, 2) + to_bytes([rate, 0, 0])
-    S[0], S[1], S[2], S[3], S[4] = bytes_to_state(iv + key + nonce)
+    S[0], S[1], S[2], S[3], S[4] = bytes_to_int(iv), k0, k1, bytes_to_int(nonce[0:8]), bytes_to_int(nonce[8:16])
     if debug: printstate(S, "initial value:")
 
-    ascon_permutation(S, a)
+    permutation(S, a)
 
-    zero_key = bytes_to_state(zero_bytes(40-len(key)) + key)
-    S[0] ^= zero_key[0]
-    S[1] ^= zero_key[1]
-    S[2] ^= zero_key[2]
-    S[3] ^= zero_key[3]
-    S[4] ^= zero_key[4]
+    S[3] ^= k0
+    S[4] ^= k1
     if debug: printstate(S, "initialization:")
 
 
-def ascon_process_associated_data(S, b, rate, associateddata):
+def ascon_process_associated_data(S, b, rate, associateddata, permutation=None):
     """
     Ascon associated data processing phase - internal helper function.
     S: Ascon state, a list of 5 64-bit integers
     b: number of intermediate rounds for permutation
     rate: block size in bytes (16 for Ascon-AEAD128)
     associateddata: a bytes object of arbitrary length
+    permutation: the permutation engine to use (default: the reference ascon_permutation)
     returns nothing, updates S
     """
+    permutation = permutation or ascon_permutation
     if len(associateddata) > 0:
         a_padding = to_bytes([0x01]) + zero_bytes(rate - (len(associateddata) % rate) - 1)
         a_padded = associateddata + a_padding
@@ -252,92 +446,174 @@ def ascon_process_associated_data(S, b, rate, associateddata):
             if rate == 16:
                 S[1] ^= bytes_to_int(a_padded[block+8:block+16])
 
-            ascon_permutation(S, b)
+            permutation(S, b)
 
     S[4] ^= 1<<63
     if debug: printstate(S, "process associated data:")
 
 
-def ascon_process_plaintext(S, b, rate, plaintext):
+def ascon_process_plaintext(S, b, rate, plaintext, permutation=None, out=None):
     """
     Ascon plaintext processing phase (during encryption) - internal helper function.
     S: Ascon state, a list of 5 64-bit integers
     b: number of intermediate rounds for permutation
     rate: block size in bytes (16 for Ascon-AEAD128)
-    plaintext: a bytes object of arbitrary length
-    returns the ciphertext (without tag), updates S
+    plaintext: a bytes-like object of arbitrary length
+    permutation: the permutation engine to use (default: the reference ascon_permutation)
+    out: an optional writable bytes-like object of at least len(plaintext) bytes that receives the ciphertext
+    returns the ciphertext (without tag) as out or a new bytearray, updates S
     """
-    p_lastlen = len(plaintext) % rate
-    p_padding = to_bytes([0x01]) + zero_bytes(rate-p_lastlen-1)
-    p_padded = plaintext + p_padding
+    permutation = permutation or ascon_permutation
+    plaintext = memoryview(plaintext).cast("B")
+    if out is None: out = bytearray(len(plaintext))
+    out_view = memoryview(out).cast("B")
+    p_fulllen = len(plaintext) - len(plaintext) % rate
 
     # first t-1 blocks
-    ciphertext = to_bytes([])
-    for block in range(0, len(p_padded) - rate, rate):
-        S[0] ^= bytes_to_int(p_padded[block:block+8])
-        S[1] ^= bytes_to_int(p_padded[block+8:block+16])
-        ciphertext += (int_to_bytes(S[0], 8) + int_to_bytes(S[1], 8))
-        ascon_permutation(S, b)
+    ascon_process_plaintext_blocks(S, b, rate, plaintext[:p_fulllen], out_view, permutation)
 
     # last block t
-    block = len(p_padded) - rate
-    S[0] ^= bytes_to_int(p_padded[block:block+8])
-    S[1] ^= bytes_to_int(p_padded[block+8:block+16])
-    ciphertext += (int_to_bytes(S[0], 8)[:min(8,p_lastlen)] + int_to_bytes(S[1], 8)[:max(0,p_lastlen-8)])
+    ascon_process_plaintext_last(S, rate, plaintext[p_fulllen:], out_view[p_fulllen:])
     if debug: printstate(S, "process plaintext:")
-    return ciphertext
+    return out
+
+
+def ascon_process_plaintext_blocks(S, b, rate, plaintext, out, permutation=None):
+    """
+    Ascon plaintext processing of complete blocks (during encryption) - internal helper function.
+    S: Ascon state, a list of 5 64-bit integers
+    b: number of intermediate rounds for permutation
+    rate: block size in bytes (16 for Ascon-AEAD128)
+    plaintext: a bytes-like object whose length is a multiple of rate
+    out: a writable bytes-like object of at least len(plaintext) bytes that receives the ciphertext
+    permutation: the permutation engine to use (default: the reference ascon_permutation)
+    returns nothing, updates S and out
+    """
+    assert rate == 16 and len(plaintext) % rate == 0
+    permutation = permutation or ascon_permutation
+    for offset in range(0, len(plaintext), BULK_BLOCKS * rate):
+        nwords = min(BULK_BLOCKS * rate, len(plaintext) - offset) // 8
+        fmt = "<{n}Q".format(n=nwords)
+        words = list(struct.unpack_from(fmt, plaintext, offset))
+        for i in range(0, nwords, 2):
+            S[0] ^= words[i]
+            S[1] ^= words[i+1]
+            words[i] = S[0]
+            words[i+1] = S[1]
+            permutation(S, b)
+        struct.pack_into(fmt, out, offset, *words)
+
+
+def ascon_process_plaintext_last(S, rate, plaintext, out):
+    """
+    Ascon plaintext processing of the last (padded) block (during encryption) - internal helper function.
+    S: Ascon state, a list of 5 64-bit integers
+    rate: block size in bytes (16 for Ascon-AEAD128)
+    plaintext: a bytes-like object of less than rate bytes
+    out: a writable bytes-like object of at least len(plaintext) bytes that receives the ciphertext
+    returns nothing, updates S and out
+    """
+    p_lastlen = len(plaintext)
+    assert rate == 16 and p_lastlen < rate
+    x = (S[0] | (S[1] << 64)) ^ int.from_bytes(plaintext, "little") ^ (1 << (8*p_lastlen))
+    S[0] = x & 0xFFFFFFFFFFFFFFFF
+    S[1] = x >> 64
+    out[:p_lastlen] = (x & ((1 << (8*p_lastlen)) - 1)).to_bytes(p_lastlen, "little")
 
 
-def ascon_process_ciphertext(S, b, rate, ciphertext):
+def ascon_process_ciphertext(S, b, rate, ciphertext, permutation=None, out=None):
     """
     Ascon ciphertext processing phase (during decryption) - internal helper function. 
     S: Ascon state, a list of 5 64-bit integers
     b: number of intermediate rounds for permutation
     rate: block size in bytes (16 for Ascon-AEAD128)
-    ciphertext: a bytes object of arbitrary length
-    returns the plaintext, updates S
+    ciphertext: a bytes-like object of arbitrary length
+    permutation: the permutation engine to use (default: the reference ascon_permutation)
+    out: an optional writable bytes-like object of at least len(ciphertext) bytes that receives the plaintext
+    returns the plaintext as out or a new bytearray, updates S
     """
-    c_lastlen = len(ciphertext) % rate
-    c_padded = ciphertext + zero_bytes(rate - c_lastlen)
+    permutation = permutation or ascon_permutation
+    ciphertext = memoryview(ciphertext).cast("B")
+    if out is None: out = bytearray(len(ciphertext))
+    out_view = memoryview(out).cast("B")
+    c_fulllen = len(ciphertext) - len(ciphertext) % rate
 
     # first t-1 blocks
-    plaintext = to_bytes([])
-    for block in range(0, len(c_padded) - rate, rate):
-        Ci = (bytes_to_int(c_padded[block:block+8]), bytes_to_int(c_padded[block+8:block+16]))
-        plaintext += (int_to_bytes(S[0] ^ Ci[0], 8) + int_to_bytes(S[1] ^ Ci[1], 8))
-        S[0] = Ci[0]
-        S[1] = Ci[1]
-        ascon_permutation(S, b)
+    ascon_process_ciphertext_blocks(S, b, rate, ciphertext[:c_fulllen], out_view, permutation)
 
     # last block t
-    block = len(c_padded) - rate
-    c_padx = zero_bytes(c_lastlen) + to_bytes([0x01]) + zero_bytes(rate-c_lastlen-1)
-    c_mask = zero_bytes(c_lastlen) + ff_bytes(rate-c_lastlen)
-    Ci = (bytes_to_int(c_padded[block:block+8]), bytes_to_int(c_padded[block+8:block+16]))
-    plaintext += (int_to_bytes(S[0] ^ Ci[0], 8) + int_to_bytes(S[1] ^ Ci[1], 8))[:c_lastlen]
-    S[0] = (S[0] & bytes_to_int(c_mask[0:8]))  ^ Ci[0] ^ bytes_to_int(c_padx[0:8])
-    S[1] = (S[1] & bytes_to_int(c_mask[8:16])) ^ Ci[1] ^ bytes_to_int(c_padx[8:16])
+    ascon_process_ciphertext_last(S, rate, ciphertext[c_fulllen:], out_view[c_fulllen:])
     if debug: printstate(S, "process ciphertext:")
-    return plaintext
+    return out
 
 
-def ascon_finalize(S, rate, a, key):
+def ascon_process_ciphertext_blocks(S, b, rate, ciphertext, out, permutation=None):
+    """
+    Ascon ciphertext processing of complete blocks (during decryption) - internal helper function.
+    S: Ascon state, a list of 5 64-bit integers
+    b: number of intermediate rounds for permutation
+    rate: block size in bytes (16 for Ascon-AEAD128)
+    ciphertext: a bytes-like object whose length is a multiple of rate
+    out: a writable bytes-like object of at least len(ciphertext) bytes that receives the plaintext
+    permutation: the permutation engine to use (default: the reference ascon_permutation)
+    returns nothing, updates S and out
+    """
+    assert rate == 16 and len(ciphertext) % rate == 0
+    permutation = permutation or ascon_permutation
+    for offset in range(0, len(ciphertext), BULK_BLOCKS * rate):
+        nwords = min(BULK_BLOCKS * rate, len(ciphertext) - offset) // 8
+        fmt = "<{n}Q".format(n=nwords)
+        words = list(struct.unpack_from(fmt, ciphertext, offset))
+        for i in range(0, nwords, 2):
+            c0 = words[i]
+            c1 = words[i+1]
+            words[i] = S[0] ^ c0
+            words[i+1] = S[1] ^ c1
+            S[0] = c0
+            S[1] = c1
+            permutation(S, b)
+        struct.pack_into(fmt, out, offset, *words)
+
+
+def ascon_process_ciphertext_last(S, rate, ciphertext, out):
+    """
+    Ascon ciphertext processing of the last (padded) block (during decryption) - internal helper function.
+    S: Ascon state, a list of 5 64-bit integers
+    rate: block size in bytes (16 for Ascon-AEAD128)
+    ciphertext: a bytes-like object of less than rate bytes
+    out: a writable bytes-like object of at least len(ciphertext) bytes that receives the plaintext
+    returns nothing, updates S and out
+    """
+    c_lastlen = len(ciphertext)
+    assert rate == 16 and c_lastlen < rate
+    c_mask = (1 << (8*c_lastlen)) - 1
+    Ci = int.from_bytes(ciphertext, "little")
+    x = S[0] | (S[1] << 64)
+    out[:c_lastlen] = ((x ^ Ci) & c_mask).to_bytes(c_lastlen, "little")
+    x = (x & ~c_mask) ^ Ci ^ (1 << (8*c_lastlen))
+    S[0] = x & 0xFFFFFFFFFFFFFFFF
+    S[1] = x >> 64
+
+
+def ascon_finalize(S, rate, a, key, permutation=None):
     """
     Ascon finalization phase - internal helper function.
     S: Ascon state, a list of 5 64-bit integers
     rate: block size in bytes (16 for Ascon-AEAD128)
     a: number of initialization/finalization rounds for permutation
-    key: a bytes object of size 16 (for Ascon-AEAD128; 128-bit security)
+    key: a bytes object of size 16 (for Ascon-AEAD128; 128-bit security) or an AsconKey
+    permutation: the permutation engine to use (default: the reference ascon_permutation)
     returns the tag, updates S
     """
-    assert len(key) == 16
-    S[rate//8+0] ^= bytes_to_int(key[0:8])
-    S[rate//8+1] ^= bytes_to_int(key[8:16])
+    permutation = permutation or ascon_permutation
+    k0, k1 = key_words(key)
+    S[rate//8+0] ^= k0
+    S[rate//8+1] ^= k1
 
-    ascon_permutation(S, a)
+    permutation(S, a)
 
-    S[3] ^= bytes_to_int(key[-16:-8])
-    S[4] ^= bytes_to_int(key[-8:])
+    S[3] ^= k0
+    S[4] ^= k1
     tag = int_to_bytes(S[3], 8) + int_to_bytes(S[4], 8)
     if debug: printstate(S, "finalization:")
     return tag
@@ -379,6 +655,93 @@ def ascon_permutation(S, rounds=1):
         if debugpermutation: printwords(S, "linear diffusion layer:")
 
 
+# === Ascon permutation (fast engine) ===
+
+ROUND_CONSTANTS = tuple(0xf0 - r*0x10 + r*0x1 for r in range(12))
+ROUND_CONSTANTS_12 = ROUND_CONSTANTS
+ROUND_CONSTANTS_8 = ROUND_CONSTANTS[4:]
+
+def ascon_rounds(S, constants):
+    """
+    Ascon core permutation on local variables - internal helper function.
+    Computes the same rounds as ascon_permutation, but keeps the state in locals,
+    inlines the S-box and rotations and has no debug output.
+    S: Ascon state, a list of 5 64-bit integers
+    constants: the round constants of the rounds to perform (a suffix of ROUND_CONSTANTS)
+    returns nothing, updates S
+    """
+    M = 0xFFFFFFFFFFFFFFFF
+    x0, x1, x2, x3, x4 = S
+    for c in constants:
+        # --- add round constants ---
+        x2 ^= c
+        # --- substitution layer ---
+        x0 ^= x4
+        x4 ^= x3
+        x2 ^= x1
+        t0 = (x0 ^ M) & x1
+        t1 = (x1 ^ M) & x2
+        t2 = (x2 ^ M) & x3
+        t3 = (x3 ^ M) & x4
+        t4 = (x4 ^ M) & x0
+        x0 ^= t1
+        x1 ^= t2
+        x2 ^= t3
+        x3 ^= t4
+        x4 ^= t0
+        x1 ^= x0
+        x0 ^= x4
+        x3 ^= x2
+        x2 ^= M
+        # --- linear diffusion layer ---
+        x0 ^= (((x0 >> 19) | (x0 << 45)) ^ ((x0 >> 28) | (x0 << 36))) & M
+        x1 ^= (((x1 >> 61) | (x1 <<  3)) ^ ((x1 >> 39) | (x1 << 25))) & M
+        x2 ^= (((x2 >>  1) | (x2 << 63)) ^ ((x2 >>  6) | (x2 << 58))) & M
+        x3 ^= (((x3 >> 10) | (x3 << 54)) ^ ((x3 >> 17) | (x3 << 47))) & M
+        x4 ^= (((x4 >>  7) | (x4 << 57)) ^ ((x4 >> 41) | (x4 << 23))) & M
+    S[0], S[1], S[2], S[3], S[4] = x0, x1, x2, x3, x4
+
+
+def ascon_permutation_12(S):
+    """
+    Ascon permutation with 12 rounds (fast engine, used for initialization/finalization).
+    S: Ascon state, a list of 5 64-bit integers
+    returns nothing, updates S
+    """
+    ascon_rounds(S, ROUND_CONSTANTS_12)
+
+
+def ascon_permutation_8(S):
+    """
+    Ascon permutation with 8 rounds (fast engine, used for data processing in Ascon-AEAD128).
+    S: Ascon state, a list of 5 64-bit integers
+    returns nothing, updates S
+    """
+    ascon_rounds(S, ROUND_CONSTANTS_8)
+
+
+def ascon_permutation_fast(S, rounds=1):
+    """
+    Drop-in replacement for ascon_permutation that uses the fast engine.
+    S: Ascon state, a list of 5 64-bit integers
+    rounds: number of rounds to perform
+    returns nothing, updates S
+    """
+    assert rounds <= 12
+    if rounds == 12: ascon_rounds(S, ROUND_CONSTANTS_12)
+    elif rounds == 8: ascon_rounds(S, ROUND_CONSTANTS_8)
+    else: ascon_rounds(S, ROUND_CONSTANTS[12-rounds:])
+
+
+def select_permutation():
+    """
+    Returns the permutation engine to use: the fast engine, unless debug output is enabled.
+    """
+    if debug or debugpermutation:
+        return ascon_permutation
+    return ascon_permutation_fast
+
+
 # === helper functions ===
 
 def get_random_bytes(num):
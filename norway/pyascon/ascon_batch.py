@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+
+"""
+Batched Ascon-AEAD128 for many independent messages, vectorized with NumPy.
+Every message is one lane; the Ascon states of all lanes are kept as five uint64 arrays.
+Results are identical to ascon.ascon_encrypt / ascon.ascon_decrypt applied to each message.
+"""
+
+import numpy as np
+
+# === constants ===
+
+RATE = 16  # bytes
+ROUNDS_A = 12
+ROUNDS_B = 8
+IV_AEAD128 = int.from_bytes(bytes([1, 0, (ROUNDS_B << 4) + ROUNDS_A]) + (128).to_bytes(2, "little") + bytes([RATE, 0, 0]), "little")
+
+ROUND_CONSTANTS = tuple(np.uint64(0xf0 - r*0x10 + r*0x1) for r in range(12))
+ROTATIONS = tuple((np.uint64(r1), np.uint64(64 - r1), np.uint64(r2), np.uint64(64 - r2))
+                  for r1, r2 in [(19, 28), (61, 39), (1, 6), (10, 17), (7, 41)])
+DOMAIN_SEPARATION = np.uint64(1 << 63)
+
+
+# === Ascon AEAD batch encryption and decryption ===
+
+def ascon_encrypt_batch(keys, nonces, ads, plaintexts, variant="Ascon-AEAD128"):
+    """
+    Ascon encryption of many independent messages at once.
+    keys: a sequence of N bytes objects of size 16
+    nonces: a sequence of N bytes objects of size 16 (must not repeat for the same key!)
+    ads: a sequence of N bytes objects of arbitrary length (associated data)
+    plaintexts: a sequence of N bytes objects of arbitrary length
+    variant: "Ascon-AEAD128"
+    returns a list of N bytes objects, the i-th equal to ascon_encrypt(keys[i], nonces[i], ads[i], plaintexts[i])
+    """
+    assert variant == "Ascon-AEAD128"
+    n = len(plaintexts)
+    assert len(keys) == n and len(nonces) == n and len(ads) == n
+    if n == 0: return []
+    X, K, lanes = ascon_initialize_batch(keys, nonces)
+    X, K, lanes = ascon_process_associated_data_batch(X, K, lanes, ads)
+
+    # order the lanes by descending number of blocks, so the active lanes of every block are a prefix
+    nblocks = np.array([len(p) // RATE + 1 for p in plaintexts], dtype=np.int64)
+    X, K, lanes = reorder_lanes(X, K, lanes, nblocks)
+    nblocks = nblocks[lanes]
+    P, starts = pad_lanes([plaintexts[i] for i in lanes], nblocks, b"\x01")
+    C = np.empty_like(P)
+    for block in range(int(nblocks[0])):
+        active = np.count_nonzero(nblocks > block)
+        continuing = np.count_nonzero(nblocks > block + 1)
+        rows = starts[:active] + block
+        X[0, :active] ^= P[rows, 0]
+        X[1, :active] ^= P[rows, 1]
+        C[rows, 0] = X[0, :active]
+        C[rows, 1] = X[1, :active]
+        if continuing: ascon_permutation_batch(X[:, :continuing], ROUNDS_B)
+
+    T = ascon_finalize_batch(X, K)
+    Cbytes = C.astype("<u8").tobytes()
+    Tbytes = T.astype("<u8").tobytes()
+    result = [None] * n
+    for lane, i in enumerate(lanes):
+        start = int(starts[lane]) * RATE
+        result[i] = Cbytes[start:start + len(plaintexts[i])] + Tbytes[lane*16:(lane+1)*16]
+    return result
+
+
+def ascon_decrypt_batch(keys, nonces, ads, ciphertexts, variant="Ascon-AEAD128"):
+    """
+    Ascon decryption of many independent messages at once.
+    keys: a sequence of N bytes objects of size 16
+    nonces: a sequence of N bytes objects of size 16
+    ads: a sequence of N bytes objects of arbitrary length (associated data)
+    ciphertexts: a sequence of N bytes objects of arbitrary length (each also contains the tag)
+    variant: "Ascon-AEAD128"
+    returns a list of N entries, the i-th being the plaintext or None if verification fails
+    """
+    assert variant == "Ascon-AEAD128"
+    n = len(ciphertexts)
+    assert len(keys) == n and len(nonces) == n and len(ads) == n
+    assert all(len(c) >= 16 for c in ciphertexts)
+    if n == 0: return []
+    X, K, lanes = ascon_initialize_batch(keys, nonces)
+    X, K, lanes = ascon_process_associated_data_batch(X, K, lanes, ads)
+
+    nblocks = np.array([(len(c) - 16) // RATE + 1 for c in ciphertexts], dtype=np.int64)
+    X, K, lanes = reorder_lanes(X, K, lanes, nblocks)
+    nblocks = nblocks[lanes]
+    bodies = [memoryview(ciphertexts[i])[:-16] for i in lanes]
+    C, starts = pad_lanes(bodies, nblocks, b"\x00")
+    P = np.empty_like(C)
+
+    # masks for the last block of every lane: keep the state bytes after the ciphertext, add the padding byte
+    lastlen = np.array([len(c) % RATE for c in bodies], dtype=np.int64)
+    byte_index = np.arange(RATE)
+    c_mask = np.where(byte_index >= lastlen[:, None], 0xFF, 0).astype(np.uint8).view("<u8").astype(np.uint64)
+    c_padx = (byte_index == lastlen[:, None]).astype(np.uint8).view("<u8").astype(np.uint64)
+
+    for block in range(int(nblocks[0])):
+        active = np.count_nonzero(nblocks > block)
+        continuing = np.count_nonzero(nblocks > block + 1)
+        # full blocks
+        if continuing:
+            rows = starts[:continuing] + block
+            Ci = C[rows]
+            P[rows, 0] = X[0, :continuing] ^ Ci[:, 0]
+            P[rows, 1] = X[1, :continuing] ^ Ci[:, 1]
+            X[0, :continuing] = Ci[:, 0]
+            X[1, :continuing] = Ci[:, 1]
+            ascon_permutation_batch(X[:, :continuing], ROUNDS_B)
+        # last blocks
+        if active > continuing:
+            last = slice(continuing, active)
+            rows = starts[last] + block
+            Ci = C[rows]
+            P[rows, 0] = X[0, last] ^ Ci[:, 0]
+            P[rows, 1] = X[1, last] ^ Ci[:, 1]
+            X[0, last] = (X[0, last] & c_mask[last, 0]) ^ Ci[:, 0] ^ c_padx[last, 0]
+            X[1, last] = (X[1, last] & c_mask[last, 1]) ^ Ci[:, 1] ^ c_padx[last, 1]
+
+    T = ascon_finalize_batch(X, K)
+    Tbytes = T.astype("<u8").tobytes()
+    Pbytes = P.astype("<u8").tobytes()
+    result = [None] * n
+    for lane, i in enumerate(lanes):
+        if Tbytes[lane*16:(lane+1)*16] == ciphertexts[i][-16:]:
+            start = int(starts[lane]) * RATE
+            result[i] = Pbytes[start:start + len(bodies[lane])]
+    return result
+
+
+# === Ascon AEAD batch building blocks ===
+
+def ascon_initialize_batch(keys, nonces):
+    """
+    Ascon initialization phase for N lanes - internal helper function.
+    keys: a sequence of N bytes objects of size 16 (or AsconKey objects)
+    nonces: a sequence of N bytes objects of size 16
+    returns the state X (a (5, N) uint64 array), the key words K (a (N, 2) uint64 array) and the lane order
+    """
+    assert all(len(k) == 16 for k in keys) and all(len(n) == 16 for n in nonces)
+    K = np.frombuffer(b"".join(bytes(k) for k in keys), dtype="<u8").reshape(-1, 2).astype(np.uint64)
+    N = np.frombuffer(b"".join(nonces), dtype="<u8").reshape(-1, 2).astype(np.uint64)
+    X = np.empty((5, len(K)), dtype=np.uint64)
+    X[0] = IV_AEAD128
+    X[1] = K[:, 0]
+    X[2] = K[:, 1]
+    X[3] = N[:, 0]
+    X[4] = N[:, 1]
+    ascon_permutation_batch(X, ROUNDS_A)
+    X[3] ^= K[:, 0]
+    X[4] ^= K[:, 1]
+    return X, K, np.arange(len(K))
+
+
+def ascon_process_associated_data_batch(X, K, lanes, ads):
+    """
+    Ascon associated data processing phase for N lanes - internal helper function.
+    X, K, lanes: state, key words and lane order as returned by ascon_initialize_batch
+    ads: a sequence of N bytes objects of arbitrary length, in the original lane order
+    returns the (possibly reordered) X, K and lanes
+    """
+    nblocks = np.array([len(ad) // RATE + 1 if len(ad) > 0 else 0 for ad in ads], dtype=np.int64)
+    if nblocks.any():
+        X, K, lanes = reorder_lanes(X, K, lanes, nblocks)
+        nblocks = nblocks[lanes]
+        A, starts = pad_lanes([ads[i] for i in lanes], nblocks, b"\x01")
+        for block in range(int(nblocks[0])):
+            active = np.count_nonzero(nblocks > block)
+            rows = starts[:active] + block
+            X[0, :active] ^= A[rows, 0]
+            X[1, :active] ^= A[rows, 1]
+            ascon_permutation_batch(X[:, :active], ROUNDS_B)
+    X[4] ^= DOMAIN_SEPARATION
+    return X, K, lanes
+
+
+def ascon_finalize_batch(X, K):
+    """
+    Ascon finalization phase for N lanes - internal helper function.
+    X: the state, a (5, N) uint64 array
+    K: the key words, a (N, 2) uint64 array in the same lane order
+    returns the tags as a (N, 2) uint64 array, updates X
+    """
+    X[2] ^= K[:, 0]
+    X[3] ^= K[:, 1]
+    ascon_permutation_batch(X, ROUNDS_A)
+    X[3] ^= K[:, 0]
+    X[4] ^= K[:, 1]
+    return np.stack([X[3], X[4]], axis=1)
+
+
+def reorder_lanes(X, K, lanes, nblocks):
+    """
+    Reorders the lanes by descending block count - internal helper function.
+    nblocks: the block count of every lane, in the original lane order
+    returns the reordered X, K and lanes
+    """
+    order = np.argsort(-nblocks[lanes], kind="stable")
+    return X[:, order], K[order], lanes[order]
+
+
+def pad_lanes(messages, nblocks, padbyte):
+    """
+    Pads and concatenates the messages of all lanes - internal helper function.
+    messages: a sequence of bytes-like objects
+    nblocks: the number of blocks of every padded message
+    padbyte: b"\\x01" for plaintext and associated data, b"\\x00" for ciphertext
+    returns the blocks as a (sum(nblocks), 2) uint64 array and the first block index of every lane
+    """
+    padded = b"".join(bytes(m) + padbyte + bytes(int(nb) * RATE - len(m) - 1) for m, nb in zip(messages, nblocks) if nb > 0)
+    blocks = np.frombuffer(padded, dtype="<u8").reshape(-1, 2).astype(np.uint64)
+    starts = np.concatenate([[0], np.cumsum(nblocks)[:-1]]).astype(np.int64)
+    return blocks, starts
+
+
+# === Ascon batch permutation ===
+
+def ascon_permutation_batch(X, rounds=1):
+    """
+    Ascon core permutation applied to all lanes at once.
+    X: the state, a (5, N) uint64 array (or a view of some of its lanes)
+    rounds: number of rounds to perform
+    returns nothing, updates X
+    """
+    assert rounds <= 12
+    x0, x1, x2, x3, x4 = X
+    T = np.empty((5, X.shape[1]), dtype=np.uint64)
+    t0, t1, t2, t3, t4 = T
+    for c in ROUND_CONSTANTS[12-rounds:]:
+        # --- add round constants ---
+        x2 ^= c
+        # --- substitution layer ---
+        x0 ^= x4
+        x4 ^= x3
+        x2 ^= x1
+        np.invert(x0, out=t0); t0 &= x1
+        np.invert(x1, out=t1); t1 &= x2
+        np.invert(x2, out=t2); t2 &= x3
+        np.invert(x3, out=t3); t3 &= x4
+        np.invert(x4, out=t4); t4 &= x0
+        x0 ^= t1
+        x1 ^= t2
+        x2 ^= t3
+        x3 ^= t4
+        x4 ^= t0
+        x1 ^= x0
+        x0 ^= x4
+        x3 ^= x2
+        np.invert(x2, out=x2)
+        # --- linear diffusion layer ---
+        for x, (r1, l1, r2, l2) in zip(X, ROTATIONS):
+            np.right_shift(x, r1, out=t0)
+            np.left_shift(x, l1, out=t1)
+            t0 |= t1
+            np.right_shift(x, r2, out=t1)
+            np.left_shift(x, l2, out=t2)
+            t1 |= t2
+            t0 ^= t1
+            x ^= t0
@@ -0,0 +1,478 @@
+"""
+Reference receiving server for the upload protocol (the remote SERVER_URL the client talks to).
+
+Routes:
+    GET  /kyber-public-key   Kyber512 public key (ETag; If-None-Match answered with 304)
+    POST /secure-ecg         encrypted ECG uploads, in every format the client sends:
+                               - binary (application/octet-stream, wire_format.py),
+                               - JSON (hex fields; with session_id/seq, or the original one-off form),
+                               - HL7 ORU text referencing an encrypted file (client.py)
+    POST /receive-hl7        plain HL7 v2 messages (hl_7_app.py)
+    GET  /stream-ecg         WebSocket stream of encrypted windows (ecg_stream.py)
+    GET  /received           counters and the most recent received records
+
+An upload is decapsulated (once per Kyber session; the session id must match the ciphertext and a
+sequence number is only accepted once), its message key is derived as in kyber_session.py, then it is
+decrypted with ascon_decrypt, decompressed, decoded and validated, and stored. Decapsulation,
+decryption and validation run on a pool of worker processes (pure-Python Ascon is CPU bound), or
+inline with workers=0; the session table is only locked to look up or insert a secret.
+
+Use Receiver directly in-process (receive() returns (status, response)), ReceiverServer to serve it
+from a background thread (tests, benchmarks), or the CLI for load tests:
+
+usage: python receiver.py [--host 0.0.0.0] [--port 5000] [--workers N] [--store-dir DIR] [--max-upload-bytes N]
+
+Configuration (environment):
+    RECEIVER_WORKERS            decryption worker processes (default: CPU count; 0 = inline)
+    RECEIVER_STORE_DIR          write every received payload to this directory (default: keep summaries only)
+    RECEIVER_MAX_UPLOAD_BYTES   largest request body accepted (default: DEFAULT_MAX_UPLOAD_BYTES, ~8 MB)
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from aiohttp import web
+from hl7apy.parser import parse_message
+from smaj_kyber import decapsulate, keygen, set_mode
+
+import chunked_aead
+import ecg_codec
+import ecg_compression
+import ecg_stream
+import kyber_session
+import metrics
+import wire_format
+from pyascon.ascon import AsconKey, ascon_decrypt
+
+DEFAULT_WORKERS = int(os.getenv("RECEIVER_WORKERS", str(os.cpu_count() or 1)))
+STORE_DIR = os.getenv("RECEIVER_STORE_DIR")
+MAX_SESSIONS = 1024
+HISTORY_SIZE = 1000
+LEGACY_FORMAT = "json"
+ASCON_TAG_BYTES = 16
+# Largest expected payload: a record serialized as JSON (10 s of 12 leads is ~0.9 MB), with room for longer ones
+MAX_PAYLOAD_BYTES = 4 * 1024 ** 2
+# That payload in a chunked_aead container (a tag per chunk), hex encoded by the JSON transport, plus other fields
+DEFAULT_MAX_UPLOAD_BYTES = int(os.getenv("RECEIVER_MAX_UPLOAD_BYTES", str(
+    2 * (chunked_aead.HEADER_SIZE + MAX_PAYLOAD_BYTES
+         + (MAX_PAYLOAD_BYTES // chunked_aead.DEFAULT_CHUNK_SIZE + 1) * ASCON_TAG_BYTES) + 64 * 1024)))
+
+log = metrics.get_logger("receiver")
+
+
+class ReceiveError(Exception):
+    """A rejected upload; status is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+    def __reduce__(self):
+        # Raised in worker processes: keep the status when pickled back
+        return ReceiveError, (self.message, self.status)
+
+
+# === Parsing ===
+
+def check_kyber_ciphertext(kyber_ciphertext):
+    """decapsulate() asserts the ciphertext length: reject other lengths as a bad request up front."""
+    if len(kyber_ciphertext) != kyber_session.CIPHERTEXT_BYTES:
+        raise ReceiveError(f"Kyber ciphertext must be {kyber_session.CIPHERTEXT_BYTES} bytes")
+    return kyber_ciphertext
+
+
+def check_fields(fields):
+    """Reject values that do not fit the wire header (struct) or hold no Ascon tag, as bad requests."""
+    check_kyber_ciphertext(fields["kyber_ciphertext"])
+    if not 0 <= fields["id"] < 2 ** 32:
+        raise ReceiveError("Athlete id must fit in 32 bits")
+    if fields["seq"] is not None and not 0 <= fields["seq"] < 2 ** 64:
+        raise ReceiveError("Sequence number must fit in 64 bits")
+    if not isinstance(fields["format"], str) or not fields["format"].isascii() or len(fields["format"]) > 255:
+        raise ReceiveError("Payload format must be at most 255 ASCII characters")
+    if len(fields["ciphertext"]) < ASCON_TAG_BYTES:
+        raise ReceiveError(f"Ascon ciphertext must be at least {ASCON_TAG_BYTES} bytes")
+
+
+def parse_binary(body):
+    """Fields of a wire_format body plus its Ascon ciphertext."""
+    try:
+        fields, offset = wire_format.unpack_header(body)
+    except ValueError as e:
+        raise ReceiveError(str(e))
+    fields["ciphertext"] = bytes(body[offset:])
+    check_fields(fields)
+    fields["transport"] = "binary"
+    return fields
+
+
+def parse_json(body):
+    """Fields of a JSON upload; without session_id it is the original one-off encapsulation form."""
+    try:
+        data = json.loads(body)
+        fields = {
+            "id": int(data.get("id", 0)),
+            "format": data.get("format", LEGACY_FORMAT),
+            "nonce": bytes.fromhex(data["nonce"]),
+            "kyber_ciphertext": bytes.fromhex(data["kyber_ciphertext"]),
+            "ciphertext": bytes.fromhex(data["ciphertext"]),
+            "associated_data": bytes.fromhex(data.get("compression", "")),
+            "session_id": bytes.fromhex(data["session_id"]) if data.get("session_id") else None,
+            "seq": int(data["seq"]) if data.get("session_id") else None,
+        }
+        fields["version"] = int(data["version"]) if fields["session_id"] else None
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        raise ReceiveError(f"Malformed JSON upload: {e}")
+    if fields["session_id"] is not None and fields["version"] != wire_format.VERSION:
+        raise ReceiveError(f"Unsupported upload version {fields['version']}")
+    if len(fields["nonce"]) != 16 or (fields["session_id"] is not None and len(fields["session_id"]) != 16):
+        raise ReceiveError("Malformed JSON upload: nonce and session id must be 16 bytes")
+    check_fields(fields)
+    fields["transport"] = "json"
+    return fields
+
+
+def hl7_segments(text):
+    """{segment name: [fields, ...]} of an HL7 v2 message (any of \\r, \\n or \\r\\n between segments)."""
+    segments = {}
+    for line in text.replace("\r\n", "\r").replace("\n", "\r").split("\r"):
+        if line.strip():
+            fields = line.split("|")
+            segments.setdefault(fields[0], []).append(fields)
+    return segments
+
+
+def parse_hl7_reference(text):
+    """The OBX values of client.py's ORU message: the link to the encrypted file, its nonce and Kyber ciphertext."""
+    values = {}
+    for fields in hl7_segments(text).get("OBX", []):
+        if len(fields) > 5:
+            values[fields[3].split("^")[0]] = fields[5]
+    try:
+        fields = {"ecg_link": values["ECG_LINK"], "nonce": bytes.fromhex(values["NONCE"]),
+                  "kyber_ciphertext": bytes.fromhex(values["KYBER_CT"])}
+    except (KeyError, ValueError) as e:
+        raise ReceiveError(f"Malformed HL7 ECG reference: {e}")
+    check_kyber_ciphertext(fields["kyber_ciphertext"])
+    return fields
+
+
+# === Decryption and validation (worker processes) ===
+
+def validate(payload, payload_format):
+    """Return a summary of a decrypted payload; raises ValueError when it is not a well-formed record."""
+    if payload_format == ecg_codec.FORMAT_NAME:
+        adc, meta = ecg_codec.decode(payload)
+        expected = ecg_codec.decode_header(payload)[1] + adc.nbytes
+        if len(payload) != expected:
+            raise ValueError(f"ECG payload is {len(payload)} bytes, expected {expected}")
+        if not meta["n_leads"] or not meta["n_samples"] or meta["fs"] <= 0:
+            raise ValueError("Empty ECG payload")
+        return {"fs": meta["fs"], "samples": meta["n_samples"], "leads": meta["lead_names"]}
+    if payload_format == "json":
+        rows = json.loads(payload)
+        if not isinstance(rows, list) or not rows or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("Expected a non-empty list of samples")
+        columns = list(rows[0])
+        if any(list(row) != columns for row in rows):
+            raise ValueError("Samples do not all have the same leads")
+        return {"samples": len(rows), "leads": [name for name in columns if name != "time"]}
+    raise ValueError(f"Unsupported payload format {payload_format!r}")
+
+
+def open_upload(shared_secret, fields):
+    """
+    Decrypt, decompress and validate one upload (parsed fields); returns (payload, summary).
+    Session uploads use the per-message key of seq, one-off uploads the first 16 bytes of the shared secret.
+    The AEAD associated data of session uploads is rebuilt from the fields as the client built it
+    (wire_format.authenticated_data); one-off uploads only authenticate their compression header.
+    """
+    start = time.perf_counter()
+    seq, nonce, compression_header = fields["seq"], fields["nonce"], fields["associated_data"]
+    if seq is None:
+        key, associateddata = shared_secret[:16], compression_header
+    else:
+        key = AsconKey(kyber_session.derive_message_key(shared_secret, seq))
+        associateddata = wire_format.authenticated_data(fields["id"], nonce, fields["format"], fields["session_id"],
+                                                        seq, compression_header)
+    plaintext = ascon_decrypt(key, nonce, associateddata, fields["ciphertext"])
+    if plaintext is None:
+        raise ReceiveError("Decryption failed (authentication tag mismatch)", 401)
+    decrypted = time.perf_counter()
+    try:
+        payload = ecg_compression.decompress(compression_header, plaintext) if compression_header else plaintext
+        summary = validate(payload, fields["format"])
+    except ValueError as e:
+        raise ReceiveError(f"Invalid payload: {e}", 422)
+    summary.update(bytes=len(payload), decrypt_ms=round((decrypted - start) * 1000, 3),
+                   validate_ms=round((time.perf_counter() - decrypted) * 1000, 3))
+    return payload, summary
+
+
+# === Receiver ===
+
+class Receiver:
+    """Key pair, Kyber session secrets, decryption workers and the received records."""
+
+    def __init__(self, public_key=None, secret_key=None, workers=DEFAULT_WORKERS, store_dir=STORE_DIR,
+                 max_upload_bytes=DEFAULT_MAX_UPLOAD_BYTES):
+        set_mode("512")
+        if public_key is None:
+            public_key, secret_key = keygen()
+        self.public_key = public_key
+        self.secret_key = secret_key
+        self.etag = '"' + hashlib.sha256(public_key).hexdigest()[:32] + '"'
+        self.workers = workers
+        # Workers decapsulate too: smaj_kyber is in Kyber768 mode in a freshly spawned process
+        self.executor = ProcessPoolExecutor(workers, initializer=set_mode, initargs=("512",)) if workers > 0 else None
+        self.store_dir = store_dir
+        self.max_upload_bytes = max_upload_bytes
+        if store_dir:
+            os.makedirs(store_dir, exist_ok=True)
+        # session id -> [shared secret, accepted sequence numbers], least recently used first
+        self.sessions = OrderedDict()
+        self.received = deque(maxlen=HISTORY_SIZE)
+        self.counts = {"received": 0, "rejected": 0, "bytes": 0, "hl7": 0}
+        self.lock = threading.Lock()
+        self.stream = ecg_stream.StreamReceiver(secret_key, self._store_window)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    # --- uploads ---
+
+    def prepare(self, body, content_type=""):
+        """Parse an upload; returns (fields, cached session secret or None when it must be decapsulated)."""
+        if len(body) > self.max_upload_bytes:
+            raise ReceiveError(f"Upload larger than {self.max_upload_bytes} bytes", 413)
+        if content_type.startswith(wire_format.CONTENT_TYPE) or body[:4] == wire_format.MAGIC:
+            fields = parse_binary(body)
+        elif body.lstrip()[:4] == b"MSH|":
+            fields = parse_hl7_reference(body.decode("utf-8", "replace"))
+            fields["transport"] = "hl7"
+            return fields, None
+        else:
+            fields = parse_json(body)
+        return fields, self.session_secret(fields)
+
+    def session_secret(self, fields):
+        """The cached secret of the upload's session (None: decapsulate); rejects sequence numbers already accepted."""
+        if fields["session_id"] is None:
+            return None
+        if kyber_session.derive_session_id(fields["kyber_ciphertext"]) != fields["session_id"]:
+            raise ReceiveError("Session id does not match the Kyber ciphertext")
+        with self.lock:
+            session = self.sessions.get(fields["session_id"])
+            if session is None:
+                return None
+            self.sessions.move_to_end(fields["session_id"])
+            self._check_seq(session, fields["seq"])
+            return session[0]
+
+    def add_session(self, fields, shared_secret):
+        """Cache a session secret decapsulated outside the lock (another request may have added it meanwhile)."""
+        session_id = fields.get("session_id")
+        if session_id is None:
+            return shared_secret
+        with self.lock:
+            session = self.sessions.setdefault(session_id, [shared_secret, set()])
+            while len(self.sessions) > MAX_SESSIONS:
+                self.sessions.popitem(last=False)
+            self.sessions.move_to_end(session_id)
+            self._check_seq(session, fields["seq"])
+            return session[0]
+
+    def _check_seq(self, session, seq):
+        if seq in session[1]:
+            # 409 makes the client start a new session
+            raise ReceiveError(f"Sequence number {seq} already used in this session", 409)
+
+    def finish(self, fields, payload, summary):
+        """Record (and store) an accepted upload; returns the response body."""
+        entry = {"id": fields["id"], "transport": fields["transport"], "format": fields["format"],
+                 "session_id": fields["session_id"].hex() if fields["session_id"] else None, "seq": fields["seq"],
+                 "received_at": time.time(), **summary}
+        if self.store_dir:
+            session = entry["session_id"][:8] if entry["session_id"] else "oneoff"
+            extension = "ecgb" if fields["format"] == ecg_codec.FORMAT_NAME else "json"
+            entry["path"] = os.path.join(self.store_dir, f"ath_{fields['id']:03d}-{session}-{fields['seq'] or 0}."
+                                                         f"{extension}")
+            with open(entry["path"], "wb") as f:
+                f.write(payload)
+        with self.lock:
+            # Marked as used only once it decrypted, so forged uploads cannot burn sequence numbers
+            session = self.sessions.get(fields["session_id"])
+            if session is not None:
+                self._check_seq(session, fields["seq"])
+                session[1].add(fields["seq"])
+            self.counts["received"] += 1
+            self.counts["bytes"] += len(fields["ciphertext"])
+            self.received.append(entry)
+        log.info("upload received", extra={key: entry[key] for key in ("id", "transport", "seq", "samples")})
+        return {"status": "received", **entry}
+
+    def accept_reference(self, fields):
+        """client.py sends only a link to the encrypted file; accepted once its Kyber ciphertext decapsulated."""
+        entry = {"transport": "hl7", "ecg_link": fields["ecg_link"], "nonce": fields["nonce"].hex(),
+                 "received_at": time.time()}
+        with self.lock:
+            self.counts["received"] += 1
+            self.received.append(entry)
+        return {"status": "received", **entry}
+
+    def reject(self, e):
+        with self.lock:
+            self.counts["rejected"] += 1
+        log.warning("upload rejected", extra={"error": e.message, "http_status": e.status})
+        return e.status, {"status": "error", "message": e.message}
+
+    def _run(self, function, *args):
+        """Call function on the worker processes from the calling thread (inline with workers=0)."""
+        if self.executor is None:
+            return function(*args)
+        return self.executor.submit(function, *args).result()
+
+    def receive(self, body, content_type=""):
+        """Handle a POST /secure-ecg body in the calling thread; returns (HTTP status, response body)."""
+        try:
+            fields, shared_secret = self.prepare(body, content_type)
+            if shared_secret is None:
+                shared_secret = self.add_session(fields, self._run(decapsulate, fields["kyber_ciphertext"],
+                                                                  self.secret_key))
+            if fields["transport"] == "hl7":
+                return 202, self.accept_reference(fields)
+            payload, summary = self._run(open_upload, shared_secret, fields)
+            return 200, self.finish(fields, payload, summary)
+        except ReceiveError as e:
+            return self.reject(e)
+
+    async def receive_async(self, body, content_type=""):
+        """receive() for the event loop: decapsulation and decryption run on the workers (a thread with workers=0)."""
+        try:
+            loop = asyncio.get_running_loop()
+            fields, shared_secret = self.prepare(body, content_type)
+            if shared_secret is None:
+                shared_secret = self.add_session(fields, await loop.run_in_executor(
+                    self.executor, decapsulate, fields["kyber_ciphertext"], self.secret_key))
+            if fields["transport"] == "hl7":
+                return 202, self.accept_reference(fields)
+            payload, summary = await loop.run_in_executor(self.executor, open_upload, shared_secret, fields)
+            return 200, self.finish(fields, payload, summary)
+        except ReceiveError as e:
+            return self.reject(e)
+
+    # --- HL7 messages and stream windows ---
+
+    def receive_hl7(self, text):
+        """Parse an HL7 v2 message; returns (HTTP status, response body)."""
+        try:
+            message = parse_message(text.replace("\r\n", "\r").replace("\n", "\r").strip(), find_groups=False)
+            entry = {"transport": "hl7", "message_type": message.msh.msh_9.to_er7(),
+                     "control_id": message.msh.msh_10.to_er7(), "received_at": time.time()}
+            pid = hl7_segments(text).get("PID")
+            if pid and len(pid[0]) > 3:
+                entry["patient_id"] = pid[0][3].split("^")[0]
+        except Exception as e:
+            return self.reject(ReceiveError(f"Malformed HL7 message: {e}"))
+        with self.lock:
+            self.counts["hl7"] += 1
+            self.received.append(entry)
+        return 200, {"status": "received", **entry}
+
+    def _store_window(self, athlete_id, first, adc, meta):
+        with self.lock:
+            self.counts["received"] += 1
+            self.received.append({"id": athlete_id, "transport": "stream", "first": first,
+                                  "samples": meta["n_samples"], "received_at": time.time()})
+
+    def stats(self):
+        with self.lock:
+            return {**self.counts, "sessions": len(self.sessions), "workers": self.workers,
+                    "stream_windows": self.stream.windows, "recent": list(self.received)[-20:]}
+
+
+# === aiohttp server ===
+
+def make_app(receiver):
+    async def kyber_public_key(request):
+        if request.headers.get("If-None-Match") == receiver.etag:
+            return web.Response(status=304, headers={"ETag": receiver.etag})
+        return web.Response(body=receiver.public_key, content_type="application/octet-stream",
+                            headers={"ETag": receiver.etag})
+
+    async def secure_ecg(request):
+        status, response = await receiver.receive_async(await request.read(), request.content_type)
+        return web.json_response(response, status=status)
+
+    async def receive_hl7(request):
+        status, response = receiver.receive_hl7(await request.text())
+        return web.json_response(response, status=status)
+
+    async def received(request):
+        return web.json_response(receiver.stats())
+
+    app = web.Application(client_max_size=receiver.max_upload_bytes)
+    app.router.add_get("/kyber-public-key", kyber_public_key)
+    app.router.add_post("/secure-ecg", secure_ecg)
+    app.router.add_post("/receive-hl7", receive_hl7)
+    app.router.add_get("/stream-ecg", receiver.stream.handle)
+    app.router.add_get("/received", received)
+    return app
+
+
+class ReceiverServer:
+    """Serves a Receiver from a background thread with its own event loop (for tests and benchmarks)."""
+
+    def __init__(self, receiver=None, host="127.0.0.1", port=0):
+        self.receiver = receiver or Receiver(workers=0)
+        self.host = host
+        self.port = port
+        self.url = None
+        self.loop = asyncio.new_event_loop()
+        self.runner = None
+        self.thread = None
+
+    def start(self):
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.runner, self.url = self.loop.run_until_complete(
+                ecg_stream.start_server(make_app(self.receiver), self.host, self.port))
+            started.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, name="receiver", daemon=True)
+        self.thread.start()
+        started.wait()
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.receiver.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reference receiver for encrypted ECG uploads")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="decryption processes (0 = inline)")
+    parser.add_argument("--store-dir", default=STORE_DIR, help="write received payloads here")
+    parser.add_argument("--max-upload-bytes", type=int, default=DEFAULT_MAX_UPLOAD_BYTES,
+                        help="largest request body accepted")
+    args = parser.parse_args()
+
+    receiver = Receiver(workers=args.workers, store_dir=args.store_dir, max_upload_bytes=args.max_upload_bytes)
+    web.run_app(make_app(receiver), host=args.host, port=args.port)
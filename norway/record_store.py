@@ -0,0 +1,181 @@
+"""
+In-memory LRU cache of decoded WFDB records, shared by the viewer and the uploader.
+
+Records are kept as their int16 ADC matrix plus calibration (8x smaller than rdsamp's float64
+signals; a memmap of the .dat file for format 16 records) and keyed by path and the mtimes of the
+.hea/.dat files, so a changed file is re-read. The least recently used records are evicted once the
+cache holds more than max_bytes of samples or max_records records.
+
+Configuration (environment):
+    RECORD_CACHE_MB       sample bytes kept in memory (default 64)
+    RECORD_CACHE_RECORDS  records kept in memory (default 256)
+"""
+
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import wfdb
+
+import ecg_codec
+import metrics
+import wfdb_memmap
+
+MAX_BYTES = int(float(os.getenv("RECORD_CACHE_MB", "64")) * 1024 * 1024)
+MAX_RECORDS = int(os.getenv("RECORD_CACHE_RECORDS", "256"))
+
+log = metrics.get_logger("records")
+
+
+class Record:
+    """A decoded record: digital samples (n_samples, n_leads) and what is needed to convert them."""
+
+    def __init__(self, path, adc, fs, gains, baselines, sig_name, comments=()):
+        self.path = path
+        self.adc = adc
+        self.fs = fs
+        self.gains = list(gains)
+        self.baselines = list(baselines)
+        self.sig_name = list(sig_name)
+        self.lead_names = [ecg_codec.LEAD_CASE_FIX.get(name, name) for name in sig_name]
+        self.comments = list(comments)
+
+    @classmethod
+    def read(cls, path):
+        """Memory-map format 16 records (see wfdb_memmap.py); read anything else with wfdb."""
+        try:
+            record = wfdb_memmap.MemmapRecord(path)
+            return cls(path, record.adc, record.fs, record.gains, record.baselines, record.sig_name, record.comments)
+        except wfdb_memmap.UnsupportedFormat:
+            pass
+        record = wfdb.rdrecord(path, physical=False)
+        return cls(path, record.d_signal.astype("<i2"), record.fs, record.adc_gain, record.baseline,
+                   record.sig_name, record.comments)
+
+    @property
+    def nbytes(self):
+        return self.adc.nbytes
+
+    @property
+    def n_samples(self):
+        return self.adc.shape[0]
+
+    @property
+    def duration(self):
+        return self.n_samples / self.fs
+
+    def physical(self):
+        """Signals in mV, as returned by wfdb.rdsamp."""
+        return ecg_codec.to_physical(self.adc, self.gains, self.baselines)
+
+    def window(self, start_sec, end_sec):
+        """Return (first sample index, signals in mV) covering [start_sec, end_sec]; only that slice is converted."""
+        if not (math.isfinite(start_sec) and math.isfinite(end_sec)):
+            raise ValueError("Window bounds must be finite")
+        start = min(self.n_samples, max(0, math.floor(start_sec * self.fs)))
+        stop = min(self.n_samples, max(start, math.ceil(end_sec * self.fs) + 1))
+        return start, ecg_codec.to_physical(self.adc[start:stop], self.gains, self.baselines)
+
+    def payload(self):
+        """The ecg_codec binary payload of the record (same as ecg_codec.encode_wfdb)."""
+        return ecg_codec.encode(self.adc, self.fs, self.gains, self.baselines, self.lead_names)
+
+
+class RecordStore:
+
+    def __init__(self, max_bytes=MAX_BYTES, max_records=MAX_RECORDS, reader=Record.read):
+        self.max_bytes = max_bytes
+        self.max_records = max_records
+        self.reader = reader
+        self.records = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(path):
+        path = os.path.abspath(path)
+        mtimes = []
+        for ext in (".hea", ".dat"):
+            try:
+                mtimes.append(os.stat(path + ext).st_mtime_ns)
+            except FileNotFoundError:
+                mtimes.append(None)
+        return path, tuple(mtimes)
+
+    def get(self, path):
+        """Return the Record for a record path (without extension), reading it on a miss."""
+        key = self.cache_key(path)
+        with self.lock:
+            record = self.records.get(key)
+            if record is not None:
+                self.records.move_to_end(key)
+                self.hits += 1
+                return record
+            self.misses += 1
+
+        record = self.reader(path)
+        with self.lock:
+            if key not in self.records:
+                self.records[key] = record
+                self.nbytes += record.nbytes
+                self._evict()
+        return record
+
+    def _evict(self):
+        while self.records and (self.nbytes > self.max_bytes or len(self.records) > self.max_records):
+            _, record = self.records.popitem(last=False)
+            self.nbytes -= record.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"records": len(self.records), "bytes": self.nbytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "hit_ratio": round(self.hits / lookups, 3) if lookups else None}
+
+    def prefetch(self, base_dir, names=None):
+        """
+        Load the records listed in base_dir/RECORDS (or names) on a background thread; returns the thread.
+        A missing dataset or record is logged, never raised, so callers can prefetch at import time.
+        """
+        def load_all():
+            nonlocal names
+            if names is None:
+                try:
+                    with open(os.path.join(base_dir, "RECORDS")) as f:
+                        names = [line.strip() for line in f if line.strip()]
+                except OSError as e:
+                    log.warning("prefetch failed", extra={"record": "RECORDS", "error": str(e)})
+                    return
+            for name in names:
+                try:
+                    self.get(os.path.join(base_dir, name))
+                except Exception as e:
+                    log.warning("prefetch failed", extra={"record": name, "error": str(e)})
+
+        thread = threading.Thread(target=load_all, name="record-prefetch", daemon=True)
+        thread.start()
+        return thread
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_store():
+    """The process-wide record store (created on first use)."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = RecordStore()
+        return _default
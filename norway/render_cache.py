@@ -0,0 +1,88 @@
+"""
+Cache of rendered viewer pages.
+
+Pages are keyed by everything that determines their content (athlete id, the record's source file
+mtimes, render settings, template mtime), so they never have to be invalidated: a changed input is a
+different key. The key's hash doubles as the page's ETag, which lets a conditional request
+(If-None-Match) be answered with 304 before anything is loaded or rendered.
+
+Rendered pages are kept in an in-memory LRU and, with a cache directory, also on disk so they
+survive restarts.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = int(os.getenv("VIEWER_CACHE_SIZE", "64"))
+
+
+def etag_for(key):
+    """Strong ETag (quoted) for a JSON-serialisable cache key."""
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+class RenderCache:
+
+    def __init__(self, max_entries=MAX_ENTRIES, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.pages = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _disk_path(self, etag):
+        return os.path.join(self.cache_dir, etag.strip('"') + ".html")
+
+    def get(self, etag):
+        with self.lock:
+            page = self.pages.get(etag)
+            if page is not None:
+                self.pages.move_to_end(etag)
+                self.hits += 1
+                return page
+        if self.cache_dir and os.path.exists(self._disk_path(etag)):
+            with open(self._disk_path(etag), encoding="utf-8") as f:
+                page = f.read()
+            with self.lock:
+                self.disk_hits += 1
+            self._put(etag, page)
+            return page
+        return None
+
+    def get_or_render(self, key, render):
+        """Return (page, etag): the cached page for key, or render() stored under it."""
+        etag = etag_for(key)
+        page = self.get(etag)
+        if page is None:
+            with self.lock:
+                self.misses += 1
+            page = render()
+            self._put(etag, page)
+            if self.cache_dir:
+                # One temporary file per writer: concurrent renders of a page must not share it
+                with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=self.cache_dir, suffix=".tmp",
+                                                 delete=False) as f:
+                    f.write(page)
+                os.replace(f.name, self._disk_path(etag))
+        return page, etag
+
+    def _put(self, etag, page):
+        with self.lock:
+            self.pages[etag] = page
+            self.pages.move_to_end(etag)
+            while len(self.pages) > self.max_entries:
+                self.pages.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            return {"pages": len(self.pages), "max_pages": self.max_entries, "hits": self.hits,
+                    "disk_hits": self.disk_hits, "misses": self.misses, "cache_dir": self.cache_dir}
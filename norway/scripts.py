@@ -1,20 +1,14 @@
-import wfdb
 import numpy as np
-import os
 import plotly.graph_objects as go
+import dataset_store
+import ecg_grid
 
 # Path to your ECG data
 directory = "/Users/mac/Desktop/secure by design/norway/norwegian-endurance-athlete-ecg-database-1.0.0/"
 
-# Load ECGs
-ECGs = []
-for filename in sorted(os.listdir(directory)):
-    if filename.endswith(".dat"):
-        record_name = filename.split(".")[0]
-        signals, fields = wfdb.rdsamp(os.path.join(directory, record_name))
-        ECGs.append(signals)
-
-ECGs = np.array(ECGs)
+# Load ECGs (from the .npy store next to the WFDB files, rebuilt only when records change)
+store = dataset_store.open_store(directory)
+ECGs = store.stack()
 print("Loaded ECGs shape:", ECGs.shape)
 
 # Get first ECG sample
@@ -44,52 +38,23 @@ for i in range(12):
         showlegend=False
     ))
 
-# Add custom ECG paper-style grid (every 0.2 sec and 0.5 mV)
-shapes = []
-grid_color = 'rgba(255, 0, 0, 0.5)'  # stronger grid
-
-# Vertical red lines every 0.2 seconds
-for t in np.arange(0, duration_sec + 0.2, 0.2):
-    shapes.append(dict(
-        type='line',
-        x0=t, x1=t,
-        y0=vertical_offsets[-1] - 2,
-        y1=vertical_offsets[0] + 2,
-        line=dict(color=grid_color, width=0.8)
-    ))
-
-# Horizontal red lines every 0.5 mV
-for y in np.arange(vertical_offsets[-1] - 2, vertical_offsets[0] + 2, 0.5):
-    shapes.append(dict(
-        type='line',
-        x0=0,
-        x1=duration_sec,
-        y0=y,
-        y1=y,
-        line=dict(color=grid_color, width=0.8)
-    ))
-
 # Layout styling
 fig.update_layout(
     title="12-Lead ECG Viewer (Clinical Layout)",
-    xaxis=dict(
-        title="Time (seconds)",
-        showgrid=False,
-        zeroline=False
-    ),
+    xaxis=dict(title="Time (seconds)"),
     yaxis=dict(
         tickmode='array',
         tickvals=vertical_offsets,
-        ticktext=lead_names,
-        showgrid=False,
-        zeroline=False
+        ticktext=lead_names
     ),
-    shapes=shapes,
     template="simple_white",
     height=800,
     margin=dict(l=60, r=30, t=60, b=40)
 )
 
+# ECG paper-style grid (every 0.2 sec and 0.5 mV, drawn as axis gridlines)
+ecg_grid.apply_ecg_grid(fig, (0, duration_sec), (vertical_offsets[-1] - 2, vertical_offsets[0] + 2))
+
 # Show and export
 fig.show()
 fig.write_html("ecg_clinical_viewer.html")
@@ -1,15 +1,16 @@
 import wfdb
 import pandas as pd
+import wfdb_memmap
 
 # Set the directory path
 directory = "/Users/mac/Desktop/secure by design/norway/norwegian-endurance-athlete-ecg-database-1.0.0/"
 record_name = "ath_001"
 
-# Load the ECG record
-record = wfdb.rdrecord(directory + record_name)
+# Load the ECG record (memory-mapped format 16 .dat, see wfdb_memmap.py)
+signals, fields = wfdb_memmap.rdsamp(directory + record_name)
 
 # Create DataFrame from signal data
-df = pd.DataFrame(record.p_signal, columns=record.sig_name)
+df = pd.DataFrame(signals, columns=fields['sig_name'])
 
 # Construct output base path
 base_path = f"{directory}{record_name}"
@@ -35,4 +36,5 @@ df.to_json(f"{base_path}.json", orient="records", lines=False)
 print(f"Exported to: {base_path}.csv, .json, .xml")
 
 # Optional: Plot the waveform
-wfdb.plot_wfdb(record=record, title='ECG from Norwegian Athlete Dataset')
+wfdb.plot_items(signal=signals, fs=fields['fs'], time_units='seconds', sig_name=fields['sig_name'],
+                sig_units=fields['units'], title='ECG from Norwegian Athlete Dataset')
@@ -1,7 +1,7 @@
-import wfdb
 import numpy as np
 import os
 import pandas as pd
+import wfdb_memmap
 
 # === Path to your ECG data ===
 directory = "/Users/mac/Desktop/secure by design/norway/norwegian-endurance-athlete-ecg-database-1.0.0/"
@@ -14,7 +14,7 @@ fields = None
 for filename in sorted(os.listdir(directory)):
     if filename.endswith(".dat"):
         record_name = filename.split(".")[0]
-        signals, fields = wfdb.rdsamp(os.path.join(directory, record_name))
+        signals, fields = wfdb_memmap.rdsamp(os.path.join(directory, record_name))
         records.append(record_name)
         break  # Only take the first file
 
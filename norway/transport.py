@@ -0,0 +1,114 @@
+"""
+Shared HTTP transport for the client upload paths.
+
+One requests.Session per process with
+  - a sized HTTPAdapter connection pool (HTTP/1.1 keep-alive, so uploads reuse TCP connections),
+  - connect and read timeouts on every request (no call can hang a Flask worker forever),
+  - bounded exponential-backoff retries for idempotent requests (GET/HEAD, e.g. the Kyber key fetch),
+  - per-endpoint latency statistics (see Transport.stats()).
+
+Configuration (environment):
+    HTTP_POOL_SIZE        connections kept per host (default 10)
+    HTTP_CONNECT_TIMEOUT  seconds (default 3.05)
+    HTTP_READ_TIMEOUT     seconds (default 30)
+    HTTP_RETRIES          retries for idempotent requests (default 3)
+    HTTP_BACKOFF          backoff factor in seconds (default 0.3: 0.3 s, 0.6 s, 1.2 s, ...)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.3"))
+LATENCY_SAMPLES = 1024
+
+
+class Transport:
+    """Pooled keep-alive HTTP client with timeouts, idempotent retries and latency statistics."""
+
+    def __init__(self, pool_size=POOL_SIZE, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 retries=RETRIES, backoff=BACKOFF):
+        self.timeout = (connect_timeout, read_timeout)
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries, backoff_factor=backoff,
+                      status_forcelist=(429, 502, 503, 504), allowed_methods=frozenset({"GET", "HEAD"}),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Connection"] = "keep-alive"
+        self.latencies = {}
+        self.lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            self._record(method, url, time.perf_counter() - start, error=True)
+            raise
+        self._record(method, url, time.perf_counter() - start, error=response.status_code >= 500)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    # === Latency statistics ===
+
+    def _record(self, method, url, seconds, error):
+        name = f"{method} {urlsplit(url).path or '/'}"
+        with self.lock:
+            entry = self.latencies.get(name)
+            if entry is None:
+                entry = self.latencies[name] = {"count": 0, "errors": 0, "total": 0.0,
+                                                "samples": deque(maxlen=LATENCY_SAMPLES)}
+            entry["count"] += 1
+            entry["errors"] += int(error)
+            entry["total"] += seconds
+            entry["samples"].append(seconds)
+
+    def stats(self):
+        """Per endpoint: request and error counts, mean and p50/p95/max latency (ms) of recent requests."""
+        result = {}
+        with self.lock:
+            for name, entry in self.latencies.items():
+                samples = sorted(entry["samples"])
+                result[name] = {
+                    "count": entry["count"],
+                    "errors": entry["errors"],
+                    "mean_ms": round(entry["total"] / entry["count"] * 1000, 3),
+                    "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+                    "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3),
+                    "max_ms": round(samples[-1] * 1000, 3),
+                }
+        return result
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_transport():
+    """The process-wide transport (created on first use)."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Transport()
+        return _default
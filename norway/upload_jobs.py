@@ -0,0 +1,209 @@
+"""
+Background job queue for uploads.
+
+A bounded in-process queue feeding a fixed pool of worker threads:
+  - submit() returns at once with a job (the caller reports its id), or raises QueueFull when the
+    queue is at capacity, so the web layer can answer 503 instead of piling up work (backpressure);
+  - a second submission for a key (e.g. an athlete) that is still queued or running returns the
+    existing job instead of starting another one (dedupe);
+  - jobs record per-stage timings through job.stage(name);
+  - with a JobStore (SQLite) jobs survive restarts: queued/running jobs are re-queued on start and
+    finished jobs can still be looked up after they have left the in-memory history.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+DEFAULT_WORKERS = int(os.getenv("UPLOAD_WORKERS", "2"))
+DEFAULT_QUEUE_SIZE = int(os.getenv("UPLOAD_QUEUE_SIZE", "32"))
+HISTORY_SIZE = 1000
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class QueueFull(Exception):
+    pass
+
+
+# === Jobs ===
+
+class Job:
+
+    def __init__(self, key, args, job_id=None, request_id=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.key = key
+        self.args = list(args)
+        # Id of the web request that submitted the job, for correlating logs
+        self.request_id = request_id
+        self.status = QUEUED
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.stages = {}
+        self.result = None
+        self.error = None
+
+    @contextmanager
+    def stage(self, name):
+        """Time a pipeline stage (milliseconds, added to the job's stage timings)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = round((time.perf_counter() - start) * 1000, 3)
+
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "key": self.key,
+            "args": self.args,
+            "request_id": self.request_id,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queued_ms": round((self.started_at - self.submitted_at) * 1000, 3) if self.started_at else None,
+            "total_ms": round((self.finished_at - self.submitted_at) * 1000, 3) if self.finished_at else None,
+            "stages": self.stages,
+            "result": self.result,
+            "error": self.error,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        job = cls(data["key"], data["args"], data["id"], data.get("request_id"))
+        for name in ("status", "submitted_at", "started_at", "finished_at", "stages", "result", "error"):
+            setattr(job, name, data[name])
+        return job
+
+
+# === Durable store ===
+
+class JobStore:
+    """SQLite table of jobs (one JSON document per job)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS jobs ("
+                              "id TEXT PRIMARY KEY, status TEXT NOT NULL, data TEXT NOT NULL, updated REAL NOT NULL)")
+
+    def save(self, job):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO jobs (id, status, data, updated) VALUES (?, ?, ?, ?)",
+                              (job.id, job.status, json.dumps(job.to_dict()), time.time()))
+
+    def get(self, job_id):
+        with self.lock:
+            row = self.conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_dict(json.loads(row[0])) if row else None
+
+    def pending(self):
+        """Jobs that were queued or running when the process stopped, oldest first."""
+        with self.lock:
+            rows = self.conn.execute("SELECT data FROM jobs WHERE status IN (?, ?) ORDER BY updated",
+                                     (QUEUED, RUNNING)).fetchall()
+        return [Job.from_dict(json.loads(row[0])) for row in rows]
+
+
+# === Queue ===
+
+class JobQueue:
+    """
+    Run handler(job, *args) on a pool of worker threads.
+    The handler's return value becomes job.result; an exception marks the job failed with str(exception).
+    """
+
+    def __init__(self, handler, workers=DEFAULT_WORKERS, max_pending=DEFAULT_QUEUE_SIZE, store=None):
+        self.handler = handler
+        self.store = store
+        self.jobs = OrderedDict()
+        self.active = {}
+        self.lock = threading.Lock()
+
+        pending = store.pending() if store is not None else []
+        self.queue = queue.Queue(maxsize=max(max_pending, len(pending)))
+        for job in pending:
+            job.status = QUEUED
+            self._track(job)
+            self.active[job.key] = job
+            self.queue.put_nowait(job)
+
+        self.workers = [threading.Thread(target=self._work, name=f"upload-worker-{i}", daemon=True)
+                        for i in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, key, *args, request_id=None):
+        """Return (job, created): the new job, or the job already queued or running for this key."""
+        with self.lock:
+            existing = self.active.get(key)
+            if existing is not None and existing.active():
+                return existing, False
+            job = Job(key, args, request_id=request_id)
+            try:
+                self.queue.put_nowait(job)
+            except queue.Full:
+                raise QueueFull(f"{self.queue.maxsize} uploads already pending")
+            self.active[key] = job
+            self._track(job)
+        self._save(job)
+        return job, True
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None and self.store is not None:
+            job = self.store.get(job_id)
+        return job
+
+    def stats(self):
+        with self.lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {"workers": len(self.workers), "pending": self.queue.qsize(),
+                "capacity": self.queue.maxsize, "jobs": counts}
+
+    def _track(self, job):
+        self.jobs[job.id] = job
+        while len(self.jobs) > HISTORY_SIZE:
+            oldest_id, oldest = next(iter(self.jobs.items()))
+            if oldest.active():
+                break
+            del self.jobs[oldest_id]
+
+    def _save(self, job):
+        if self.store is not None:
+            self.store.save(job)
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            job.status = RUNNING
+            job.started_at = time.time()
+            self._save(job)
+            try:
+                job.result = self.handler(job, *job.args)
+                job.status = DONE
+            except Exception as e:
+                job.error = str(e)
+                job.status = FAILED
+            job.finished_at = time.time()
+            with self.lock:
+                if self.active.get(job.key) is job:
+                    del self.active[job.key]
+            self._save(job)
+            self.queue.task_done()
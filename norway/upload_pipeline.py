@@ -0,0 +1,190 @@
+"""
+Upload pipeline for one ECG record: load -> serialize (+ compress) -> encrypt -> send.
+
+Each stage is a separate function so the same steps can run synchronously, as a background job
+(upload_jobs.py, with per-stage timings) or spread over worker pools. Every stage is also timed into
+the process-wide stage histograms, and upload sizes are counted (see metrics.py).
+"""
+
+import json
+import os
+from contextlib import nullcontext
+
+import requests
+from smaj_kyber import set_mode
+
+import ecg_codec
+import ecg_compression
+import kyber_session
+import metrics
+import record_store
+import transport
+import wire_format
+from pyascon.ascon import ascon_encrypt
+
+# === Path & Crypto Setup ===
+BASE_ECG_DIR = "/Users/mac/Desktop/secure by design/norway/norwegian-endurance-athlete-ecg-database-1.0.0/"
+SERVER_URL = os.getenv("SERVER_URL")
+# "ecg-int16-v1" (raw ADC counts, see ecg_codec.py) or "json" (record-oriented DataFrame JSON)
+PAYLOAD_FORMAT = os.getenv("ECG_PAYLOAD_FORMAT", ecg_codec.FORMAT_NAME)
+# "zlib", "lzma" or "none"; the delta order only applies to the ecg-int16-v1 format
+COMPRESSION = os.getenv("ECG_COMPRESSION", "zlib")
+DELTA_ORDER = int(os.getenv("ECG_DELTA_ORDER", "1"))
+# "binary" (application/octet-stream, see wire_format.py) or "json" (hex fields in a JSON body)
+UPLOAD_TRANSPORT = os.getenv("ECG_UPLOAD_TRANSPORT", "binary")
+
+set_mode("512")
+# Server public key cached (revalidated with ETag after KYBER_KEY_TTL seconds), one encapsulation per session
+HTTP = transport.get_transport()
+ASCON_TAG_BYTES = 16
+log = metrics.get_logger("upload")
+
+KYBER_SESSIONS = kyber_session.SessionManager(kyber_session.PublicKeyCache(f"{SERVER_URL}/kyber-public-key", http=HTTP))
+
+
+class UploadError(Exception):
+    """A failed pipeline stage; status is the HTTP status the web layer should answer with."""
+
+    def __init__(self, message, error="", status=500):
+        super().__init__(f"{message}: {error}" if error else message)
+        self.message = message
+        self.error = error
+        self.status = status
+
+
+def record_path(athlete_id):
+    return os.path.join(BASE_ECG_DIR, f"ath_{athlete_id:03d}")
+
+
+# === Stages ===
+
+@metrics.timer("load")
+def load_record(athlete_id):
+    try:
+        return record_store.get_store().get(record_path(athlete_id)).payload()
+    except Exception as e:
+        raise UploadError(f"ECG record not found for athlete {athlete_id}", str(e), 404)
+
+
+@metrics.timer("serialize")
+def serialize(ecg_payload):
+    """Return (compression_header, plaintext, compression_stats) for an ecg_codec payload."""
+    if PAYLOAD_FORMAT == "json":
+        plaintext = ecg_codec.to_dataframe(ecg_payload).to_json(orient='records').encode()
+    else:
+        plaintext = ecg_payload
+    # Compressed before encryption; the header is bound as associated data
+    compression_header, plaintext, compression_stats = ecg_compression.compress(plaintext, COMPRESSION, DELTA_ORDER)
+    metrics.count_bytes("plaintext", compression_stats["raw_bytes"])
+    log.info("payload compressed", extra=compression_stats)
+    return compression_header, plaintext, compression_stats
+
+
+@metrics.timer("session")
+def next_message():
+    """Return (session, seq, key, nonce): the current Kyber session and a fresh per-message key and nonce."""
+    try:
+        session = KYBER_SESSIONS.current()
+    except Exception as e:
+        raise UploadError("Kyber key fetch failed", str(e))
+    seq, key, nonce = session.next_message()
+    return session, seq, key, nonce
+
+
+def associated_data(athlete_id, compression_header, message, payload_format=None):
+    """The AEAD associated data of an upload (wire_format.authenticated_data), for encrypting it elsewhere."""
+    session, seq, _, nonce = message
+    return wire_format.authenticated_data(athlete_id, nonce, payload_format or PAYLOAD_FORMAT, session.session_id, seq,
+                                          compression_header)
+
+
+def build_request(athlete_id, compression_header, plaintext, message=None, ciphertext=None,
+                  upload_transport=None, payload_format=None):
+    """
+    Return the keyword arguments of the /secure-ecg POST.
+    message: (session, seq, key, nonce) from next_message(); ciphertext: plaintext already encrypted
+    with associated_data() (e.g. by a worker process); otherwise the binary transport encrypts while
+    the body is streamed, and that time is observed as the "encrypt" stage once the body is sent.
+    upload_transport and payload_format default to UPLOAD_TRANSPORT and PAYLOAD_FORMAT.
+    """
+    upload_transport = upload_transport or UPLOAD_TRANSPORT
+    payload_format = payload_format or PAYLOAD_FORMAT
+    session, seq, key, nonce = message = message or next_message()
+    ct = session.kyber_ciphertext
+    associateddata = associated_data(athlete_id, compression_header, message, payload_format)
+    metrics.count_bytes("ciphertext", len(ciphertext) if ciphertext is not None else len(plaintext) + ASCON_TAG_BYTES)
+
+    if upload_transport == "binary":
+        header = wire_format.pack_header(athlete_id, nonce, ct, compression_header, payload_format,
+                                         session.session_id, seq)
+        if ciphertext is None:
+            body = metrics.timed("encrypt", wire_format.iter_body(header, key, nonce, associateddata, plaintext))
+        else:
+            body = header + ciphertext
+        return {"data": body, "headers": {"Content-Type": wire_format.CONTENT_TYPE}}
+
+    if ciphertext is None:
+        with metrics.timer("encrypt"):
+            ciphertext = ascon_encrypt(key=key, nonce=nonce, plaintext=plaintext, associateddata=associateddata)
+    payload = {
+        "version": wire_format.VERSION,
+        "format": payload_format,
+        "compression": compression_header.hex(),
+        "nonce": nonce.hex(),
+        "ciphertext": ciphertext.hex(),
+        "kyber_ciphertext": ct.hex(),
+        "session_id": session.session_id.hex(),
+        "seq": seq,
+        "id": athlete_id
+    }
+    return {"json": payload, "headers": {"Content-Type": "application/json"}}
+
+
+@metrics.timer("send")
+def send(request_args):
+    request_args = _count_wire_bytes(request_args)
+    try:
+        r = HTTP.post(f"{SERVER_URL}/secure-ecg", **request_args)
+    except requests.exceptions.RequestException as e:
+        log.warning("upload failed", extra={"error": str(e)})
+        raise UploadError("Upload failed", str(e))
+    log.info("upload sent", extra={"http_status": r.status_code, "ms": round(r.elapsed.total_seconds() * 1000, 3)})
+    if r.status_code in (401, 409):
+        # Server no longer knows the session (restart, key rotation): start a new one next time
+        KYBER_SESSIONS.reset()
+    return r
+
+
+def _count_wire_bytes(request_args):
+    """Count the HTTP body size; streamed bodies are counted as they are sent."""
+    if "json" in request_args:
+        metrics.count_bytes("wire", len(json.dumps(request_args["json"])))
+    elif isinstance(request_args.get("data"), (bytes, bytearray)):
+        metrics.count_bytes("wire", len(request_args["data"]))
+    else:
+        request_args = dict(request_args, data=metrics.counted("wire", request_args["data"]))
+    return request_args
+
+
+# === Whole pipeline ===
+
+def upload(athlete_id, job=None):
+    """Run every stage for one athlete (timed per stage when a job is given) and return the result summary."""
+    stage = job.stage if job is not None else (lambda name: nullcontext())
+    log.info("upload started", extra={"athlete_id": athlete_id, "job_id": job.id if job is not None else None})
+    with metrics.timer("upload"):
+        with stage("session"):
+            message = next_message()
+        with stage("load"):
+            ecg_payload = load_record(athlete_id)
+        with stage("serialize"):
+            compression_header, plaintext, compression_stats = serialize(ecg_payload)
+        # The binary transport encrypts while sending, so "send" includes encryption there
+        with stage("encrypt"):
+            request_args = build_request(athlete_id, compression_header, plaintext, message)
+        with stage("send"):
+            r = send(request_args)
+    if not r.ok:
+        # The receiver rejected the upload: fail the job instead of reporting success
+        raise UploadError(f"Upload rejected by the receiver (HTTP {r.status_code})", r.text, 502)
+    return {"status": "success", "response": r.text, "compression": compression_stats}
@@ -0,0 +1,157 @@
+"""
+Zero-copy reader for WFDB records stored in format 16 (the format of every record in the
+Norwegian athlete database).
+
+The .hea file is parsed directly and the .dat file is np.memmap'ed as an (n_samples, n_signals)
+int16 array, so opening a record reads nothing but the header. Lead and time-range slices are
+taken on the int16 view and only the requested slice is converted to mV (gain/baseline applied),
+instead of converting the whole record to float64 like wfdb.rdsamp does.
+
+Records in other formats, or split across several .dat files, raise UnsupportedFormat; callers
+fall back to wfdb for those.
+"""
+
+import os
+import re
+
+import numpy as np
+
+DIGITAL_NAN = -32768  # format 16 missing sample
+DEFAULT_GAIN = 200.0  # WFDB default when the header gives 0 or no gain
+SUPPORTED_FORMATS = {"16": "<i2"}
+
+# format[xsamples][:skew][+offset]
+_FORMAT_FIELD = re.compile(r"^(\d+)(?:x(\d+))?(?::(\d+))?(?:\+(\d+))?$")
+# gain[(baseline)][/units]
+_GAIN_FIELD = re.compile(r"^([-+\d.eE]+)(?:\((-?\d+)\))?(?:/(.*))?$")
+
+
+class UnsupportedFormat(Exception):
+    pass
+
+
+# === Header ===
+
+def parse_header(record_path):
+    """Parse record_path.hea into a dict (record line fields, one dict per signal, comments)."""
+    with open(record_path + ".hea") as f:
+        lines = [line.strip() for line in f]
+    comments = [line[1:].strip() for line in lines if line.startswith("#")]
+    lines = [line for line in lines if line and not line.startswith("#")]
+
+    record_fields = lines[0].split()
+    if "/" in record_fields[0]:
+        raise UnsupportedFormat("Multi-segment records are not supported")
+    n_sig = int(record_fields[1])
+    fs = float(record_fields[2].split("/")[0].split("(")[0]) if len(record_fields) > 2 else 250.0
+    sig_len = int(record_fields[3]) if len(record_fields) > 3 else None
+
+    signals = []
+    for line in lines[1:1 + n_sig]:
+        fields = line.split(maxsplit=8)
+        fmt = _FORMAT_FIELD.match(fields[1])
+        if fmt is None:
+            raise ValueError(f"Malformed signal format {fields[1]!r}")
+        gain_field = _GAIN_FIELD.match(fields[2]) if len(fields) > 2 else None
+        adc_zero = int(fields[4]) if len(fields) > 4 else 0
+        gain = float(gain_field.group(1)) if gain_field else 0.0
+        signals.append({
+            "file_name": fields[0],
+            "fmt": fmt.group(1),
+            "samples_per_frame": int(fmt.group(2) or 1),
+            "skew": int(fmt.group(3) or 0),
+            "byte_offset": int(fmt.group(4) or 0),
+            "adc_gain": gain or DEFAULT_GAIN,
+            "baseline": int(gain_field.group(2)) if gain_field and gain_field.group(2) else adc_zero,
+            "units": (gain_field.group(3) if gain_field and gain_field.group(3) else "mV"),
+            "adc_res": int(fields[3]) if len(fields) > 3 else 0,
+            "adc_zero": adc_zero,
+            "init_value": int(fields[5]) if len(fields) > 5 else None,
+            "checksum": int(fields[6]) if len(fields) > 6 else None,
+            "block_size": int(fields[7]) if len(fields) > 7 else 0,
+            "sig_name": fields[8] if len(fields) > 8 else f"ch{len(signals) + 1}",
+        })
+    return {"record_name": record_fields[0], "n_sig": n_sig, "fs": fs, "sig_len": sig_len,
+            "signals": signals, "comments": comments}
+
+
+# === Record ===
+
+class MemmapRecord:
+    """A format 16 record whose samples are a read-only int16 memmap of the .dat file."""
+
+    def __init__(self, record_path):
+        self.path = record_path
+        header = parse_header(record_path)
+        signals = header["signals"]
+        files = {s["file_name"] for s in signals}
+        formats = {s["fmt"] for s in signals}
+        if len(files) != 1 or len(formats) != 1 or formats - SUPPORTED_FORMATS.keys():
+            raise UnsupportedFormat(f"Only single-file format 16 records are supported (got {sorted(formats)})")
+        if any(s["samples_per_frame"] != 1 or s["skew"] for s in signals):
+            raise UnsupportedFormat("Multi-frequency or skewed signals are not supported")
+
+        dtype = np.dtype(SUPPORTED_FORMATS[formats.pop()])
+        dat_path = os.path.join(os.path.dirname(record_path), files.pop())
+        offset = signals[0]["byte_offset"]
+        n_sig = len(signals)
+        available = (os.path.getsize(dat_path) - offset) // (dtype.itemsize * n_sig)
+        n_samples = available if header["sig_len"] is None else min(header["sig_len"], available)
+
+        self.fs = header["fs"]
+        self.comments = header["comments"]
+        self.sig_name = [s["sig_name"] for s in signals]
+        self.units = [s["units"] for s in signals]
+        self.gains = [s["adc_gain"] for s in signals]
+        self.baselines = [s["baseline"] for s in signals]
+        self.adc = (np.memmap(dat_path, dtype=dtype, mode="r", offset=offset, shape=(n_samples, n_sig))
+                    if n_samples else np.zeros((0, n_sig), dtype=dtype))
+
+    @property
+    def n_samples(self):
+        return self.adc.shape[0]
+
+    def channel_index(self, lead):
+        return self.sig_name.index(lead) if isinstance(lead, str) else int(lead)
+
+    def samples(self, start=0, stop=None, channels=None, physical=True):
+        """Samples [start, stop) of the given channels (names or indices, default all), in mV unless physical=False."""
+        channels = list(range(len(self.sig_name))) if channels is None else [self.channel_index(c) for c in channels]
+        adc = self.adc[start:stop, channels]
+        if not physical:
+            return np.array(adc)
+        signals = (adc - np.asarray(self.baselines, dtype=np.float64)[channels]) / np.asarray(self.gains)[channels]
+        signals[adc == DIGITAL_NAN] = np.nan
+        return signals
+
+    def lead(self, lead, start=0, stop=None, physical=True):
+        """One lead as a 1-D array."""
+        return self.samples(start, stop, [lead], physical)[:, 0]
+
+    def window(self, start_sec, end_sec, channels=None, physical=True):
+        """Samples between two times in seconds."""
+        start = max(0, int(round(start_sec * self.fs)))
+        stop = min(self.n_samples, int(round(end_sec * self.fs)))
+        return self.samples(start, max(start, stop), channels, physical)
+
+    def time_axis(self, start=0, stop=None):
+        return np.arange(start, self.n_samples if stop is None else min(stop, self.n_samples)) / self.fs
+
+
+def rdsamp(record_name, sampfrom=0, sampto=None, channels=None):
+    """Drop-in for wfdb.rdsamp on format 16 records: returns (signals in mV, fields)."""
+    record = MemmapRecord(record_name)
+    sampto = record.n_samples if sampto is None else sampto
+    channels = list(range(len(record.sig_name))) if channels is None else list(channels)
+    signals = record.samples(sampfrom, sampto, channels)
+    fields = {
+        "fs": record.fs,
+        "sig_len": signals.shape[0],
+        "n_sig": len(channels),
+        "base_date": None,
+        "base_time": None,
+        "units": [record.units[c] for c in channels],
+        "sig_name": [record.sig_name[c] for c in channels],
+        "comments": record.comments,
+    }
+    return signals, fields